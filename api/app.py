@@ -1,36 +1,210 @@
 # © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
 # Unauthorized use, reproduction, or modification is strictly prohibited.
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import pandas as pd
 import numpy as np
-import joblib
+import hmac
 import os
 import sys
+import threading
+import time
 
 # Path setup
 app = Flask(__name__)
-CORS(app)
+# Browsers on other origins may call the public API, never /admin/*
+CORS(app, resources={r"^/(?!admin/).*": {}})
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(BASE_DIR)
 
-from src.data_cleaning import clean_data
+from src.data_cleaning import load_clean_data, code_mask
+from src.trend_analysis import build_trend_index, trend_statistics, rank_trends, trend_note
+from src.ingest import STORE_DIR, cell_sums, load_aggregates, manifest_path, store_exists
+from src.compiled_forest import CompiledForest
+from src.instrumentation import HTTP_LATENCY, render_prometheus
+from src.geo import GEOJSON_PATH, CountyResolver
+from src.topology import load_topologies, pick_level
+from api import config
+from api.http_cache import StaticBody
+from api.model_utils import load_serving_model, model_crops, PredictionCache, predict_batch, recommend_crops
 
 # Load model and base year
 MODEL_PATH = os.path.join(BASE_DIR, "models", "trained_model.pkl")
+FOREST_DIR = os.path.join(BASE_DIR, "models", "forest")
+FORECAST_DIR = os.path.join(BASE_DIR, "models", "forecast")
+MANIFEST_PATH = os.path.join(BASE_DIR, "models", "manifest.json")
 BASE_YEAR_PATH = os.path.join(BASE_DIR, "models", "base_year.txt")
 DATA_PATH = os.path.join(BASE_DIR, "data", "kenya_only.csv")
 
-model = joblib.load(MODEL_PATH)
-print("✅ Loaded model from:", MODEL_PATH)
+prediction_cache = PredictionCache(config.PREDICTION_CACHE_SIZE, config.PREDICTION_CACHE_TTL)
+serving = None
+reload_lock = threading.Lock()
 
-with open(BASE_YEAR_PATH, "r") as f:
-    base_year = int(f.read().strip())
-print("📦 Loaded base year:", base_year)
+def load_serving():
+    # Build the new model + base_year off to the side, then swap in one assignment
+    global serving
+    with reload_lock:
+        new_serving = load_serving_model(MODEL_PATH, FOREST_DIR, MANIFEST_PATH, BASE_YEAR_PATH, FORECAST_DIR)
+        serving = new_serving
+        prediction_cache.clear()
+    source = FOREST_DIR if isinstance(new_serving.model, CompiledForest) else MODEL_PATH
+    print("✅ Loaded model from:", source, "version", new_serving.version)
+    print("📦 Loaded base year:", new_serving.base_year)
+    if new_serving.forecast is None:
+        print("⚠️ No forecast cube for this model version; /forecast routes disabled")
+    return new_serving
+
+load_serving()
+
+def model_files_signature():
+    paths = [MODEL_PATH, MANIFEST_PATH, BASE_YEAR_PATH, os.path.join(FOREST_DIR, "meta.json"),
+             os.path.join(FORECAST_DIR, "meta.json")]
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in paths)
+
+def watch_files(signature, reload, interval, label):
+    last = signature()
+    while True:
+        time.sleep(interval)
+        current = signature()
+        if current != last:
+            try:
+                reload()
+                last = current
+            except Exception as e:
+                # Half-written files: keep serving the old state, retry next tick
+                print(f"⚠️ {label} reload failed:", e)
+
+# County boundaries for the map (read and compressed once at startup), the
+# quantized topology per zoom level and the lat/lon -> county index, all
+# built from the same file
+geometry_body = None
+topology_bodies = {}
+map_counties = []
+county_resolver = None
+if os.path.exists(GEOJSON_PATH):
+    geometry_body = StaticBody.from_file(
+        GEOJSON_PATH, "application/geo+json", max_age=config.GEOMETRY_MAX_AGE
+    )
+    topologies = load_topologies(GEOJSON_PATH)
+    topology_bodies = {
+        level: StaticBody.from_json(topo, max_age=config.GEOMETRY_MAX_AGE)
+        for level, topo in topologies.items()
+    }
+    # Value arrays from /geometry/values follow this (geometry) order
+    map_counties = [
+        geom["properties"]["county"]
+        for geom in topologies["full"]["objects"]["counties"]["geometries"]
+    ]
+    county_resolver = CountyResolver(GEOJSON_PATH)
 
 # Load and clean the data for metadata and trends
-df = clean_data(DATA_PATH)
+data_rows = 0
+trend_index = {}
+county_crops = None
+crop_list = []
+trend_stats = None
+metadata_body = None
+county_value_bodies = {}
+
+def load_data():
+    global data_rows, trend_index, county_crops, crop_list, trend_stats, metadata_body, county_value_bodies
+    # Prefer the append-only store (src/ingest.py). Everything below is derived
+    # from its running aggregates, so a reload never reads the row parts.
+    if store_exists(STORE_DIR):
+        aggregates, manifest = load_aggregates(STORE_DIR)
+        data_rows = manifest["rows"]
+        cells = aggregates.cell_frame()
+        trend_index = aggregates.trend_index()
+    else:
+        # Integer-coded dimensions + downcast numerics; only needed until it's summed into cells
+        df = load_clean_data(DATA_PATH, compact=True)
+        data_rows = len(df)
+        cells = cell_sums(df)
+        # (county, crop) -> yearly series, slope, note; rebuilt on every reload
+        trend_index = build_trend_index(df)
+        del df
+    # Candidate (county, crop) pairs for recommendations
+    county_crops = cells[["county", "crop"]].drop_duplicates().reset_index(drop=True)
+    # OLS slope/intercept/r2/n for every pair, for /trends/ranking
+    yearly = cells[["county", "crop", "year"]].assign(
+        yield_ton_per_ha=cells["yield_sum"] / cells["yield_count"]
+    )
+    trend_stats = trend_statistics(None, yearly)
+    print("📈 Indexed trends for", len(trend_index), "county/crop pairs")
+    # Serialized and compressed once; /metadata only compares ETags after this
+    crop_list = sorted(cells["crop"].dropna().unique().tolist())
+    metadata_body = StaticBody.from_json({
+        "counties": sorted(cells["county"].dropna().unique().tolist()),
+        "crops": crop_list,
+    }, max_age=config.METADATA_MAX_AGE)
+    # Mean yield per county for every crop, as arrays in map geometry order
+    totals = cells.groupby(["crop", "county"], observed=True)[["yield_sum", "yield_count"]].sum()
+    means = (
+        (totals["yield_sum"] / totals["yield_count"])
+        .unstack("county")
+        .reindex(columns=map_counties)
+        .round(2)
+    )
+    county_value_bodies = {
+        str(crop): StaticBody.from_json({
+            "crop": str(crop),
+            "values": [None if np.isnan(v) else float(v) for v in row],
+            "units": "tons/ha"
+        }, max_age=config.METADATA_MAX_AGE)
+        for crop, row in zip(means.index, means.to_numpy())
+    }
+
+load_data()
+
+def data_files_signature():
+    # ingest.py commits a delta by replacing the store manifest
+    paths = [manifest_path(STORE_DIR), DATA_PATH]
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in paths)
+
+def start_watchers():
+    watchers = [
+        (model_files_signature, load_serving, config.MODEL_WATCH_SECONDS, "Model"),
+        (data_files_signature, load_data, config.DATA_WATCH_SECONDS, "Data"),
+    ]
+    for signature, reload, interval, label in watchers:
+        if interval > 0:
+            threading.Thread(
+                target=watch_files, args=(signature, reload, interval, label), daemon=True
+            ).start()
+
+# Under the preforking server each worker starts its own watchers after fork
+if not config.PREFORK:
+    start_watchers()
+
+def known_crops(current):
+    # Crops this model can encode; anything else gets a per-row error, never the baseline encoding
+    return model_crops(current.model.feature_names_in_, crop_list, current.baseline_crop)
+
+def parse_points(data):
+    # [[lat, lon], ...] -> (n, 2) float array
+    points = np.asarray(data["points"], dtype=np.float64)
+    if points.size == 0:
+        return points.reshape(0, 2)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError("'points' must be a list of [lat, lon] pairs")
+    return points
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        # Label by route template so /predict/batch etc. stay one series each
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_LATENCY.observe(time.perf_counter() - start, route, request.method, str(response.status_code))
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/")
 def index():
@@ -38,37 +212,212 @@ def index():
 
 @app.route("/metadata", methods=["GET"])
 def metadata():
-    counties = sorted(df["county"].dropna().unique().tolist())
-    crops = sorted(df["crop"].dropna().unique().tolist())
-    return jsonify({"counties": counties, "crops": crops})
+    return metadata_body.response()
+
+@app.route("/geometry/counties", methods=["GET"])
+def county_geometry():
+    if geometry_body is None:
+        return jsonify({"error": "County GeoJSON not found."}), 404
+    return geometry_body.response()
+
+@app.route("/geometry/topology", methods=["GET"])
+def county_topology():
+    # Quantized shared-arc county topology; ?zoom=N serves a level simplified for that zoom
+    if not topology_bodies:
+        return jsonify({"error": "County GeoJSON not found."}), 404
+    try:
+        zoom = request.args.get("zoom")
+        level = pick_level(topology_bodies, int(zoom) if zoom is not None else None)
+    except ValueError:
+        return jsonify({"error": "zoom must be an integer"}), 400
+    return topology_bodies[level].response()
+
+@app.route("/geometry/values", methods=["GET"])
+def county_values():
+    # Mean yield per county for one crop, aligned with the topology's geometries
+    body = county_value_bodies.get(request.args.get("crop"))
+    if body is None:
+        return jsonify({"error": "Unknown crop."}), 404
+    return body.response()
 
 @app.route("/predict", methods=["POST"])
 def predict():
     try:
         data = request.get_json()
-        year = int(data["year"])
-        area_ha = float(data["area_ha"])
+        row = {"year": data["year"], "area_ha": data["area_ha"], "crop": data["crop"]}
+
+        # Encode straight into the model's feature order and score it
+        current = serving
+        result = predict_batch(
+            current.model, [row], current.base_year, data["all_crops"],
+            cache=prediction_cache, version=current.version, known_crops=known_crops(current)
+        )[0]
+        if "error" in result:
+            raise ValueError(result["error"])
+        predicted_yield = result["predicted_yield"]
+
+        return jsonify({
+            "predicted_yield": round(predicted_yield, 2),
+            "units": "tons/ha"
+        })
+
+    except Exception as e:
+        return jsonify({"error": f"Prediction failed: {str(e)}"}), 400
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_many():
+    try:
+        data = request.get_json()
+        rows = data["rows"]
+        if not isinstance(rows, list):
+            raise ValueError("'rows' must be a list")
+
+        current = serving
+        results = predict_batch(
+            current.model, rows, current.base_year, data.get("all_crops"),
+            cache=prediction_cache, version=current.version, known_crops=known_crops(current)
+        )
+
+        return jsonify({
+            "predictions": results,
+            "units": "tons/ha"
+        })
+
+    except Exception as e:
+        return jsonify({"error": f"Batch prediction failed: {str(e)}"}), 400
+
+@app.route("/locate", methods=["POST"])
+def locate():
+    if county_resolver is None:
+        return jsonify({"error": "County GeoJSON not found."}), 503
+    try:
+        points = parse_points(request.get_json())
+        return jsonify({"counties": county_resolver.resolve(points[:, 0], points[:, 1])})
+    except Exception as e:
+        return jsonify({"error": f"Location lookup failed: {str(e)}"}), 400
+
+@app.route("/predict/location", methods=["POST"])
+def predict_location():
+    if county_resolver is None:
+        return jsonify({"error": "County GeoJSON not found."}), 503
+    try:
+        data = request.get_json()
+        points = parse_points(data)
         crop = data["crop"]
-        all_crops = data["all_crops"]
+        county_ids = county_resolver.resolve_ids(points[:, 0], points[:, 1])
 
-        # Convert year to year_since_start
-        year_since_start = year - base_year
+        # County isn't a model feature, so each resolved county growing the crop is scored once
+        grown = set(county_crops.loc[county_crops["crop"] == crop, "county"])
+        counties = [county_resolver.counties[i] for i in np.unique(county_ids[county_ids >= 0])]
+        counties = [c for c in counties if c in grown]
+        rows = [{"year": data["year"], "area_ha": data["area_ha"], "crop": crop} for _ in counties]
 
-        # Build input vector
-        input_data = {"year_since_start": year_since_start, "area_ha": area_ha}
-        for c in all_crops:
-            input_data[f"crop_{c}"] = 1 if c == crop else 0
+        current = serving
+        scored = predict_batch(
+            current.model, rows, current.base_year, data.get("all_crops"),
+            cache=prediction_cache, version=current.version, known_crops=known_crops(current)
+        )
+        by_county = dict(zip(counties, scored))
 
-        input_df = pd.DataFrame([input_data])[model.feature_names_in_]
-        predicted_yield = model.predict(input_df)[0]
+        results = []
+        for i, county_id in enumerate(county_ids.tolist()):
+            if county_id < 0:
+                results.append({"index": i, "county": None, "error": "Location is outside Kenya's counties."})
+                continue
+            county = county_resolver.counties[county_id]
+            result = by_county.get(county)
+            if result is None:
+                results.append({"index": i, "county": county, "error": "No data found for selected county and crop."})
+            elif "error" in result:
+                results.append({"index": i, "county": county, "error": result["error"]})
+            else:
+                results.append({"index": i, "county": county, "predicted_yield": result["predicted_yield"]})
 
         return jsonify({
-            "predicted_yield": round(predicted_yield, 2),
+            "predictions": results,
             "units": "tons/ha"
         })
 
     except Exception as e:
-        return jsonify({"error": f"Prediction failed: {str(e)}"}), 400
+        return jsonify({"error": f"Location prediction failed: {str(e)}"}), 400
+
+@app.route("/recommend", methods=["POST"])
+def recommend():
+    try:
+        data = request.get_json()
+        year = int(data["year"])
+        area_ha = float(data["area_ha"])
+        top_n = data.get("top_n")
+
+        # One county, a list of counties, or all of them when omitted
+        counties = data.get("counties")
+        if "county" in data:
+            counties = [data["county"]]
+        pairs = county_crops
+        if counties is not None:
+            pairs = pairs[code_mask(pairs["county"], counties)]
+            if pairs.empty:
+                return jsonify({"error": "No data found for selected counties."})
+
+        current = serving
+        ranked = recommend_crops(
+            current.model, pairs, year, area_ha, current.base_year,
+            top_n=int(top_n) if top_n is not None else None
+        )
+        ranked["predicted_yield"] = ranked["predicted_yield"].round(2)
+
+        return jsonify({
+            "recommendations": ranked.to_dict(orient="records"),
+            "units": "tons/ha"
+        })
+
+    except Exception as e:
+        return jsonify({"error": f"Recommendation failed: {str(e)}"}), 400
+
+@app.route("/forecast", methods=["GET"])
+def forecast():
+    # One precomputed cell: ?county=&crop=&year=&area_ha= (area must be a standard bucket)
+    cube = serving.forecast
+    if cube is None:
+        return jsonify({"error": "Forecasts not materialized for the current model."}), 503
+    try:
+        args = request.args
+        value = cube.lookup(args["county"], args["crop"], args["year"], args["area_ha"])
+        if value is None:
+            return jsonify({"error": "No data found for selected county and crop."})
+        return jsonify({
+            "county": args["county"], "crop": args["crop"],
+            "year": int(args["year"]), "area_ha": float(args["area_ha"]),
+            "predicted_yield": round(value, 2),
+            "units": "tons/ha"
+        })
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Forecast lookup failed: {str(e)}", "dims": cube.labels}), 400
+
+@app.route("/forecast/slice", methods=["GET"])
+def forecast_slice():
+    # Any subset of county/crop/year/area_ha, e.g. ?crop=Maize&year=2026 -> every county and area
+    cube = serving.forecast
+    if cube is None:
+        return jsonify({"error": "Forecasts not materialized for the current model."}), 503
+    try:
+        fixed = {dim: request.args.get(dim) for dim in ("county", "crop", "year", "area_ha")}
+        cells = cube.slice(**fixed)
+        cells["predicted_yield"] = cells["predicted_yield"].round(2)
+        return jsonify({
+            "forecasts": cells.to_dict(orient="records"),
+            "model_version": cube.version,
+            "units": "tons/ha"
+        })
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Forecast slice failed: {str(e)}", "dims": cube.labels}), 400
+
+@app.route("/forecast/dims", methods=["GET"])
+def forecast_dims():
+    cube = serving.forecast
+    if cube is None:
+        return jsonify({"error": "Forecasts not materialized for the current model."}), 503
+    return jsonify({"dims": cube.labels, "model_version": cube.version})
 
 @app.route("/trend", methods=["POST"])
 def trend():
@@ -77,26 +426,102 @@ def trend():
         county = data["county"]
         crop = data["crop"]
 
-        trend_df = df[(df["county"] == county) & (df["crop"] == crop)]
-        if trend_df.empty:
+        entry = trend_index.get((county, crop))
+        if entry is None:
             return jsonify({"error": "No data found for selected county and crop."})
 
-        trend = trend_df.groupby("year")["yield_ton_per_ha"].mean().reset_index()
+        return jsonify({
+            "trend": entry["trend"],
+            "trend_note": entry["trend_note"]
+        })
+
+    except Exception as e:
+        return jsonify({"error": f"Trend analysis failed: {str(e)}"}), 400
+
+RANKING_COLUMNS = ["slope", "intercept", "r2", "n", "mean_yield", "first_year", "last_year"]
 
-        slope = np.polyfit(trend["year"], trend["yield_ton_per_ha"], 1)[0]
-        note = "⚖️ Yield is relatively stable."
-        if slope > 0.2:
-            note = "📈 Yield is increasing. Good trend."
-        elif slope < -0.2:
-            note = "📉 Yield is decreasing. Caution advised."
+def arg_list(name):
+    # ?crop=Maize&crop=Beans or ?crop=Maize,Beans
+    values = [v.strip() for raw in request.args.getlist(name) for v in raw.split(",") if v.strip()]
+    return values or None
+
+def arg_float(name):
+    value = request.args.get(name)
+    return float(value) if value is not None else None
+
+@app.route("/trends/ranking", methods=["GET"])
+def trends_ranking():
+    # Default: every county/crop pair, fastest declining yield first
+    try:
+        sort_by = request.args.get("sort", "slope")
+        if sort_by not in RANKING_COLUMNS:
+            raise ValueError(f"sort must be one of {', '.join(RANKING_COLUMNS)}")
+        order = request.args.get("order", "asc")
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be 'asc' or 'desc'")
+        limit = request.args.get("limit", "50")
+
+        ranked = rank_trends(
+            trend_stats, sort_by=sort_by, ascending=order == "asc",
+            counties=arg_list("county"), crops=arg_list("crop"),
+            min_n=int(request.args.get("min_n", "2")),
+            min_r2=arg_float("min_r2"),
+            min_slope=arg_float("min_slope"), max_slope=arg_float("max_slope"),
+            limit=int(limit) if limit != "all" else None,
+        )
+        ranked = ranked.round({"slope": 4, "intercept": 4, "r2": 4, "mean_yield": 4})
+        ranked["trend_note"] = ranked["slope"].map(trend_note)
 
         return jsonify({
-            "trend": trend.to_dict(orient="records"),
-            "trend_note": note
+            "trends": ranked.to_dict(orient="records"),
+            "units": "tons/ha per year"
         })
 
     except Exception as e:
-        return jsonify({"error": f"Trend analysis failed: {str(e)}"}), 400
+        return jsonify({"error": f"Trend ranking failed: {str(e)}"}), 400
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    stats = prediction_cache.stats()
+    stats["model_version"] = serving.version
+    return jsonify(stats)
+
+LOOPBACK_ADDRS = {"127.0.0.1", "::1"}
+
+def admin_denied():
+    # With a token configured it is required; without one, only local callers are let in
+    if config.ADMIN_TOKEN:
+        supplied = request.headers.get("X-Admin-Token", "")
+        if not hmac.compare_digest(supplied.encode(), config.ADMIN_TOKEN.encode()):
+            return jsonify({"error": "Unauthorized"}), 401
+    elif request.remote_addr not in LOOPBACK_ADDRS:
+        return jsonify({"error": "Admin routes are local-only unless MAVUNO_ADMIN_TOKEN is set."}), 403
+    return None
+
+@app.route("/admin/reload-model", methods=["POST"])
+def reload_model():
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        new_serving = load_serving()
+        return jsonify({"model_version": new_serving.version, "base_year": new_serving.base_year})
+    except Exception as e:
+        return jsonify({"error": f"Model reload failed: {str(e)}"}), 500
+
+@app.route("/admin/reload-data", methods=["POST"])
+def reload_data():
+    # Pick up rows appended by `python src/ingest.py <delta.csv>`. Only the
+    # worker serving this request reloads; under the preforking server set
+    # MAVUNO_DATA_WATCH_SECONDS so every worker follows the store instead
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        load_data()
+        return jsonify({"rows": data_rows, "pairs": len(trend_index)})
+    except Exception as e:
+        return jsonify({"error": f"Data reload failed: {str(e)}"}), 500
 
 if __name__ == "__main__":
     app.run(debug=True)
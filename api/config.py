@@ -0,0 +1,31 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import os
+
+# Prediction cache (entries are keyed on model version + encoded features)
+PREDICTION_CACHE_SIZE = int(os.environ.get("MAVUNO_PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.environ.get("MAVUNO_PREDICTION_CACHE_TTL", "3600"))
+
+# Poll the model files every N seconds and hot-swap on change (0 = off)
+MODEL_WATCH_SECONDS = float(os.environ.get("MAVUNO_MODEL_WATCH_SECONDS", "0"))
+
+# Poll the ingest store manifest (and the source CSV) every N seconds and
+# reload the data on change (0 = off)
+DATA_WATCH_SECONDS = float(os.environ.get("MAVUNO_DATA_WATCH_SECONDS", "0"))
+
+# Required in the X-Admin-Token header for /admin/* routes when set; unset,
+# those routes only answer requests from loopback addresses
+ADMIN_TOKEN = os.environ.get("MAVUNO_ADMIN_TOKEN")
+
+# Cache-Control max-age (seconds) for /metadata and the county geometry;
+# clients revalidate with If-None-Match afterwards
+METADATA_MAX_AGE = int(os.environ.get("MAVUNO_METADATA_MAX_AGE", "300"))
+GEOMETRY_MAX_AGE = int(os.environ.get("MAVUNO_GEOMETRY_MAX_AGE", "86400"))
+
+# Production serving (api/gunicorn.conf.py)
+BIND = os.environ.get("MAVUNO_BIND", "0.0.0.0:5000")
+WORKERS = int(os.environ.get("MAVUNO_WORKERS", str(os.cpu_count() or 1)))
+THREADS = int(os.environ.get("MAVUNO_THREADS", "4"))
+# Set by the gunicorn config before the app is preloaded in the master
+PREFORK = os.environ.get("MAVUNO_PREFORK") == "1"
@@ -0,0 +1,50 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+Gunicorn config for serving the API on every core.
+
+    gunicorn -c api/gunicorn.conf.py api.wsgi:app
+
+The app (model + cleaned data + trend index) is imported once in the master
+(preload_app) and workers are forked from it, so they share those pages
+copy-on-write instead of each loading their own copy. The compiled forest
+is memory-mapped, so its pages are shared through the OS page cache even
+after a hot reload.
+
+Env: MAVUNO_BIND, MAVUNO_WORKERS (default: CPU count), MAVUNO_THREADS
+(default: 4), plus the cache/watcher settings in api/config.py.
+With several workers, hot reloads should go through the file watchers
+(MAVUNO_MODEL_WATCH_SECONDS, MAVUNO_DATA_WATCH_SECONDS); /admin/reload-model
+and /admin/reload-data only reload the worker that happens to serve the
+request.
+"""
+
+import gc
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Must be set before api.app is preloaded so it leaves the watchers to post_fork
+os.environ["MAVUNO_PREFORK"] = "1"
+
+# Not imported as `config`: gunicorn would read that name as its own setting
+from api import config as mavuno_config  # noqa: E402
+
+bind = mavuno_config.BIND
+workers = mavuno_config.WORKERS
+threads = mavuno_config.THREADS
+worker_class = "gthread" if threads > 1 else "sync"
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the GC's reach; otherwise the first
+    # collection in each worker touches every object and unshares its page
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from api.app import start_watchers
+    start_watchers()
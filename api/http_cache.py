@@ -0,0 +1,78 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+Precomputed response bodies for read-only endpoints (/metadata, the county
+GeoJSON). Each body is serialized and compressed once when it is built, so
+a request costs a header comparison: a 304 when the client's ETag still
+matches, otherwise the stored gzip/brotli/identity bytes.
+"""
+
+import gzip
+import hashlib
+import json
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Server preference when the client accepts several encodings equally
+ENCODINGS = ("br", "gzip")
+
+
+class StaticBody:
+    def __init__(self, body, mimetype, max_age):
+        self.mimetype = mimetype
+        self.cache_control = f"public, max-age={int(max_age)}"
+        digest = hashlib.sha256(body).hexdigest()[:32]
+
+        # encoding -> (bytes, strong ETag); each representation gets its own tag
+        self.variants = {"identity": (body, f'"{digest}"')}
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[encoding] = (data, f'"{digest}-{encoding}"')
+        self.etags = {tag for _, tag in self.variants.values()}
+
+    @classmethod
+    def from_json(cls, obj, max_age):
+        body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return cls(body, "application/json", max_age)
+
+    @classmethod
+    def from_file(cls, path, mimetype, max_age):
+        with open(path, "rb") as f:
+            return cls(f.read(), mimetype, max_age)
+
+    def negotiate(self, accept_encodings):
+        best, best_q = "identity", 0
+        for encoding in ENCODINGS:
+            q = accept_encodings[encoding]
+            if encoding in self.variants and q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def response(self):
+        """Build the response for the current Flask request."""
+        encoding = self.negotiate(request.accept_encodings)
+        body, etag = self.variants[encoding]
+
+        # Any of our tags means the client already holds the current content.
+        # If-None-Match uses the weak comparison (RFC 7232 §3.2), so W/"tag" matches too
+        if any(request.if_none_match.contains_weak(tag.strip('"')) for tag in self.etags) \
+                or request.if_none_match.star_tag:
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=self.mimetype)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = self.cache_control
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
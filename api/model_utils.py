@@ -0,0 +1,275 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.compiled_forest import CompiledForest
+from src.forecast_cube import load_forecast_cube
+from src.instrumentation import INFERENCE_BATCH_SIZE
+
+
+def load_model(model_path, forest_dir=None, manifest_path=None):
+    """
+    Prefer the compiled flat-array forest (memory-mapped, no unpickling) when
+    it was exported from the model named in the training manifest; otherwise
+    fall back to the pickled sklearn model.
+    """
+    if forest_dir and manifest_path and os.path.exists(manifest_path) \
+            and os.path.exists(os.path.join(forest_dir, "meta.json")):
+        with open(manifest_path) as f:
+            version = json.load(f).get("version")
+        forest = CompiledForest(forest_dir)
+        if version is not None and forest.version == version:
+            return forest
+    model = joblib.load(model_path)
+    # Training fits on all cores; at serve time that would oversubscribe workers
+    if hasattr(model, "n_jobs"):
+        model.set_params(n_jobs=1)
+    return model
+
+
+# Everything a prediction depends on, swapped as one object on reload
+ServingModel = namedtuple(
+    "ServingModel", ["model", "base_year", "version", "forecast", "baseline_crop"], defaults=[None, None]
+)
+
+
+def load_serving_model(model_path, forest_dir, manifest_path, base_year_path, forecast_dir=None):
+    model = load_model(model_path, forest_dir, manifest_path)
+    with open(base_year_path, "r") as f:
+        base_year = int(f.read().strip())
+
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    version = getattr(model, "version", None) or manifest.get("version")
+    if version is None:
+        version = f"mtime-{os.path.getmtime(model_path):.0f}"
+
+    # Only a cube materialized from this very model is served
+    forecast = load_forecast_cube(forecast_dir, version) if forecast_dir else None
+    # The manifest's baseline only describes the model it was written with
+    baseline = manifest.get("baseline_crop") if manifest.get("version") == version else None
+
+    return ServingModel(model, base_year, version, forecast, baseline)
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU + TTL cache of raw predictions. Keys include the model
+    version, so entries from a previous model can never be served.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and now - entry[1] <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    values.append(entry[0])
+                else:
+                    if entry is not None:
+                        del self._data[key]
+                    self.misses += 1
+                    values.append(None)
+        return values
+
+    def put_many(self, items):
+        now = time.monotonic()
+        with self._lock:
+            for key, value in items:
+                self._data[key] = (value, now)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+            }
+
+
+def predict_matrix(model, X):
+    # The compiled forest takes the raw matrix; sklearn wants named columns
+    INFERENCE_BATCH_SIZE.observe(len(X), type(model).__name__)
+    if isinstance(model, CompiledForest):
+        return model.predict(X)
+    return model.predict(pd.DataFrame(X, columns=model.feature_names_in_, copy=False))
+
+
+def model_crops(feature_names, crops, baseline=None):
+    """
+    The crops in `crops` (the server's crop list) the model can encode: those
+    with a crop_* column plus the drop_first baseline, which has none. The
+    baseline comes from the training manifest; incremental runs append new
+    crops' columns, so sort order alone can't identify it. Manifests written
+    before it was recorded fall back to the first training crop in sorted
+    order: of the column-less crops, the last one sorting before every
+    encoded crop.
+    """
+    encoded = {name[len("crop_"):] for name in feature_names
+               if name.startswith("crop_") and not name.startswith("crop_production_system_")}
+    known = {c for c in crops if c in encoded}
+    if baseline is not None:
+        known.add(baseline)
+        return known
+    first_encoded = min(encoded) if encoded else None
+    baseline = [c for c in crops if c not in encoded and (first_encoded is None or c < first_encoded)]
+    if baseline:
+        known.add(max(baseline))
+    return known
+
+
+def build_feature_matrix(rows, feature_names, base_year, all_crops=None, known_crops=None):
+    """
+    Encode a list of {"year", "area_ha", "crop"} dicts into one feature matrix
+    ordered like `feature_names` (the model's feature_names_in_). Rows whose
+    crop is outside `known_crops` (see model_crops) or the caller's
+    `all_crops` are rejected instead of getting the baseline encoding.
+
+    Returns (X, valid_idx, errors): X only holds the rows that encoded cleanly,
+    valid_idx maps them back to their input positions and errors maps input
+    position -> message for the rows that were rejected.
+    """
+    feature_names = list(feature_names)
+    col_index = {name: i for i, name in enumerate(feature_names)}
+    year_col = col_index.get("year_since_start")
+    area_col = col_index.get("area_ha")
+    requested_crops = set(all_crops) if all_crops is not None else None
+
+    years = np.empty(len(rows), dtype=np.float64)
+    areas = np.empty(len(rows), dtype=np.float64)
+    crop_cols = np.full(len(rows), -1, dtype=np.int64)
+    valid_idx = []
+    errors = {}
+
+    for i, row in enumerate(rows):
+        try:
+            year = int(row["year"])
+            area_ha = float(row["area_ha"])
+            crop = row["crop"]
+            unknown = (known_crops is not None and crop not in known_crops) or \
+                (requested_crops is not None and crop not in requested_crops)
+        except (KeyError, TypeError, ValueError) as e:
+            errors[i] = f"Invalid row: {str(e)}"
+            continue
+
+        if unknown:
+            errors[i] = f"Unknown crop: {crop}"
+            continue
+
+        n = len(valid_idx)
+        years[n] = year - base_year
+        areas[n] = area_ha
+        # Crops without a column are the drop_first baseline -> all zeros
+        crop_cols[n] = col_index.get(f"crop_{crop}", -1)
+        valid_idx.append(i)
+
+    n = len(valid_idx)
+    X = np.zeros((n, len(feature_names)), dtype=np.float64)
+    if year_col is not None:
+        X[:, year_col] = years[:n]
+    if area_col is not None:
+        X[:, area_col] = areas[:n]
+    has_crop = crop_cols[:n] >= 0
+    X[np.nonzero(has_crop)[0], crop_cols[:n][has_crop]] = 1.0
+
+    return X, valid_idx, errors
+
+
+def predict_batch(model, rows, base_year, all_crops=None, cache=None, version=None, known_crops=None):
+    """
+    Score many rows with a single model.predict call. Returns one result dict
+    per input row, in input order, carrying either the prediction or an error.
+    With a PredictionCache, rows whose encoded feature vector was already
+    scored by this model version are answered from it and only the misses
+    reach the model.
+    """
+    feature_names = model.feature_names_in_
+    X, valid_idx, errors = build_feature_matrix(rows, feature_names, base_year, all_crops, known_crops)
+
+    results = [None] * len(rows)
+    if valid_idx:
+        if cache is None:
+            preds = predict_matrix(model, X)
+        else:
+            keys = [(version, x.tobytes()) for x in X]
+            preds = cache.get_many(keys)
+            missing = [j for j, p in enumerate(preds) if p is None]
+            if missing:
+                fresh = predict_matrix(model, X[missing])
+                cache.put_many((keys[j], float(p)) for j, p in zip(missing, fresh))
+                for j, p in zip(missing, fresh):
+                    preds[j] = p
+
+        for i, value in zip(valid_idx, preds):
+            results[i] = {"index": i, "predicted_yield": round(float(value), 2)}
+
+    for i, message in errors.items():
+        results[i] = {"index": i, "error": message}
+
+    return results
+
+
+def recommend_crops(model, pairs, year, area_ha, base_year, top_n=None):
+    """
+    Rank candidate crops per county with one batched predict call.
+
+    `pairs` is a frame of the (county, crop) combinations to score, e.g.
+    df[["county", "crop"]].drop_duplicates(); filter it beforehand to
+    restrict the counties. Returns county, crop, predicted_yield and rank
+    (1 = best) sorted by county then rank, keeping the top_n crops per county
+    when given.
+    """
+    pairs = pairs[["county", "crop"]].dropna().reset_index(drop=True)
+
+    # The model has no county feature, so each distinct crop is scored once
+    # and the result broadcast to every county that grows it
+    crops = pairs["crop"].unique().tolist()
+    rows = [{"year": year, "area_ha": area_ha, "crop": c} for c in crops]
+    X, valid_idx, _ = build_feature_matrix(rows, model.feature_names_in_, base_year)
+    scores = {}
+    if valid_idx:
+        preds = predict_matrix(model, X)
+        scores = {crops[i]: float(p) for i, p in zip(valid_idx, preds)}
+
+    ranked = pairs[pairs["crop"].isin(scores.keys())].copy()
+    # astype: mapping a categorical crop column would keep a categorical dtype
+    ranked["predicted_yield"] = ranked["crop"].map(scores).astype(np.float64)
+    ranked = ranked.sort_values(["county", "predicted_yield"], ascending=[True, False])
+    ranked["rank"] = ranked.groupby("county", observed=True).cumcount() + 1
+    if top_n is not None:
+        ranked = ranked[ranked["rank"] <= top_n]
+
+    return ranked.reset_index(drop=True)
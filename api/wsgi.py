@@ -0,0 +1,15 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+WSGI entry point for production serving:
+
+    gunicorn -c api/gunicorn.conf.py api.wsgi:app
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.app import app  # noqa: E402
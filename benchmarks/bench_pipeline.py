@@ -0,0 +1,124 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+Microbenchmarks for the pipeline stages at several synthetic dataset sizes.
+
+    python benchmarks/bench_pipeline.py --scales 1 10 100 --out bench.json
+
+Covers clean_data, feature encoding, train_model (run in a scratch working
+directory so models/ is left alone) and model.predict for one row and for
+batches, with both the compiled forest and the sklearn model. Results are
+JSON (stdout, or --out); progress goes to stderr.
+"""
+
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.common import emit, run_info, synthetic_csv, time_call  # noqa: E402
+
+with contextlib.redirect_stdout(sys.stderr):
+    import pandas as pd
+    from src.compiled_forest import CompiledForest, export_forest
+    from src.data_cleaning import clean_data, snapshot_path
+    from src import model_training
+
+
+def bench_scale(scale, work_dir, repeat, train):
+    csv_path = synthetic_csv(scale, os.path.join(work_dir, f"kenya_x{scale}.csv"))
+    results = []
+
+    def record(name, stats, **extra):
+        print(f"⏱️ x{scale} {name}: {stats['median_ms']} ms", file=sys.stderr)
+        results.append({"benchmark": name, "scale": scale, **extra, **stats})
+
+    df = clean_data(csv_path)
+    record("clean_data", time_call(lambda: clean_data(csv_path), repeat), rows=len(df))
+
+    base_year = df["year"].min()
+    record("encode_features", time_call(lambda: model_training.encode_features(df, base_year), repeat),
+           rows=len(df))
+
+    if train:
+        # train_model writes to ./models and snapshots the CSV; keep both out of the repo
+        cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                record("train_model", time_call(
+                    lambda: model_training.train_model(data_path=csv_path), repeat=1, warmup=0
+                ), rows=len(df))
+        finally:
+            os.chdir(cwd)
+            snapshot = snapshot_path(csv_path)
+            if os.path.exists(snapshot):
+                os.remove(snapshot)
+
+    return results, df
+
+
+def bench_predict(df, model, forest, repeat):
+    results = []
+    X, feature_cols, _ = model_training.encode_features(df, df["year"].min())
+    X = pd.DataFrame(X, columns=feature_cols)[model.feature_names_in_]
+    model.set_params(n_jobs=1)
+
+    for batch in [1, 100, 1000, 10000]:
+        if batch > len(X):
+            break
+        X_batch = X.iloc[:batch]
+        X_raw = X_batch.to_numpy()
+        for name, fn in [
+            ("predict_sklearn", lambda: model.predict(X_batch)),
+            ("predict_compiled", lambda: forest.predict(X_raw)),
+        ]:
+            stats = time_call(fn, repeat)
+            stats["rows_per_s"] = round(batch / (stats["median_ms"] / 1000), 1)
+            print(f"⏱️ {name} batch={batch}: {stats['median_ms']} ms", file=sys.stderr)
+            results.append({"benchmark": name, "batch_size": batch, **stats})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--train-scales", type=int, nargs="*", default=[1, 10],
+                        help="scales to run train_model at (it is slow at 100x)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="mavuno-bench-")
+    results = []
+    try:
+        df_1x = None
+        for scale in args.scales:
+            scale_results, df = bench_scale(scale, work_dir, args.repeat, scale in args.train_scales)
+            results += scale_results
+            if scale == 1:
+                df_1x = df
+
+        # Prediction: fresh 1x model so the numbers don't depend on what's in models/
+        if df_1x is None:
+            df_1x = clean_data(synthetic_csv(1, os.path.join(work_dir, "kenya_x1.csv")))
+        X, feature_cols, _ = model_training.encode_features(df_1x, df_1x["year"].min())
+        model = model_training.RandomForestRegressor(
+            n_estimators=model_training.N_ESTIMATORS, random_state=42, n_jobs=-1
+        ).fit(pd.DataFrame(X, columns=feature_cols), df_1x["yield_ton_per_ha"].to_numpy())
+        export_forest(model, os.path.join(work_dir, "forest"))
+        forest = CompiledForest(os.path.join(work_dir, "forest"))
+        results += bench_predict(df_1x, model, forest, args.repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    emit({"suite": "pipeline", **run_info(), "results": results}, args.out)
+
+
+if __name__ == "__main__":
+    main()
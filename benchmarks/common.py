@@ -0,0 +1,95 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BASE_DIR)
+
+DATA_PATH = os.path.join(BASE_DIR, "data", "kenya_only.csv")
+
+
+def time_call(fn, repeat=5, warmup=1):
+    """Run fn() warmup + repeat times; returns timing stats in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+def latency_summary(samples_s):
+    ms = np.asarray(samples_s) * 1000
+    return {
+        "count": int(len(ms)),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def synthetic_csv(scale, out_path, seed=42):
+    """
+    kenya_only.csv replicated `scale` times with area/production jittered, so
+    larger inputs keep the real column mix and category cardinality.
+    """
+    base = pd.read_csv(DATA_PATH)
+    if scale == 1:
+        base.to_csv(out_path, index=False)
+        return out_path
+
+    rng = np.random.default_rng(seed)
+    frames = [base]
+    for _ in range(scale - 1):
+        copy = base.copy()
+        jitter = rng.uniform(0.8, 1.2, len(copy))
+        copy["area"] = pd.to_numeric(copy["area"], errors="coerce") * jitter
+        copy["production"] = pd.to_numeric(copy["production"], errors="coerce") * jitter
+        frames.append(copy)
+    pd.concat(frames, ignore_index=True).to_csv(out_path, index=False)
+    return out_path
+
+
+def run_info():
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def emit(report, out_path=None):
+    text = json.dumps(report, indent=2)
+    if out_path:
+        with open(out_path, "w") as f:
+            f.write(text + "\n")
+        print("💾 Saved benchmark results to:", out_path, file=sys.stderr)
+    else:
+        print(text)
@@ -0,0 +1,161 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+Replays a mix of /predict, /trend and /metadata traffic and reports
+throughput plus p50/p95/p99 latency per route as JSON.
+
+    python benchmarks/load_test.py --requests 2000                 # Flask test client, in-process
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --concurrency 16
+
+Without --url the app is imported and driven through its test client (one
+thread; measures handler cost). With --url requests go over HTTP from a
+thread pool, so it measures the whole server (e.g. the gunicorn config).
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.common import DATA_PATH, emit, latency_summary, run_info  # noqa: E402
+
+# Share of each route in the replayed traffic
+DEFAULT_MIX = {"/predict": 0.6, "/trend": 0.3, "/metadata": 0.1}
+
+
+def build_workload(n, mix, seed=42):
+    """(method, path, json) tuples drawn from the real county/crop pairs."""
+    with contextlib.redirect_stdout(sys.stderr):
+        from src.data_cleaning import load_clean_data
+        df = load_clean_data(DATA_PATH)
+    pairs = df[["county", "crop"]].drop_duplicates().values.tolist()
+    all_crops = sorted(df["crop"].unique().tolist())
+
+    rng = random.Random(seed)
+    routes, weights = zip(*mix.items())
+    workload = []
+    for route in rng.choices(routes, weights=weights, k=n):
+        county, crop = rng.choice(pairs)
+        if route == "/predict":
+            payload = {
+                "year": rng.randint(2024, 2030),
+                "area_ha": round(rng.uniform(1, 500), 1),
+                "crop": crop,
+                "all_crops": all_crops,
+            }
+            workload.append(("POST", route, payload))
+        elif route == "/trend":
+            workload.append(("POST", route, {"county": county, "crop": crop}))
+        else:
+            workload.append(("GET", route, None))
+    return workload
+
+
+def run_test_client(workload):
+    with contextlib.redirect_stdout(sys.stderr):
+        from api.app import app
+    client = app.test_client()
+
+    samples = []
+    for method, path, payload in workload:
+        start = time.perf_counter()
+        if method == "POST":
+            response = client.post(path, json=payload)
+        else:
+            response = client.get(path)
+        samples.append((path, time.perf_counter() - start, response.status_code))
+    return samples
+
+
+def run_http(workload, url, concurrency, timeout):
+    import requests
+
+    local = threading.local()
+
+    def send(item):
+        method, path, payload = item
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url.rstrip("/") + path, json=payload, timeout=timeout)
+            status = response.status_code
+        except requests.RequestException:
+            status = None
+        return path, time.perf_counter() - start, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(send, workload))
+
+
+def summarize(samples, wall_s):
+    by_route = defaultdict(list)
+    errors = defaultdict(int)
+    for path, elapsed, status in samples:
+        by_route[path].append(elapsed)
+        if status is None or status >= 400:
+            errors[path] += 1
+
+    routes = {}
+    for path, latencies in sorted(by_route.items()):
+        routes[path] = {
+            **latency_summary(latencies),
+            "errors": errors[path],
+            "throughput_rps": round(len(latencies) / wall_s, 1),
+        }
+    return {
+        "overall": {
+            **latency_summary([s[1] for s in samples]),
+            "errors": sum(errors.values()),
+            "wall_s": round(wall_s, 3),
+            "throughput_rps": round(len(samples) / wall_s, 1),
+        },
+        "routes": routes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--url", help="base URL of a running server; default is the in-process test client")
+    parser.add_argument("--concurrency", type=int, default=8, help="HTTP mode only")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    workload = build_workload(args.requests + args.warmup, DEFAULT_MIX)
+    warmup, workload = workload[:args.warmup], workload[args.warmup:]
+
+    if args.url:
+        run_http(warmup, args.url, args.concurrency, args.timeout)
+        start = time.perf_counter()
+        samples = run_http(workload, args.url, args.concurrency, args.timeout)
+    else:
+        run_test_client(warmup)
+        start = time.perf_counter()
+        samples = run_test_client(workload)
+    wall_s = time.perf_counter() - start
+
+    report = {
+        "suite": "api_load",
+        **run_info(),
+        "target": args.url or "flask-test-client",
+        "concurrency": args.concurrency if args.url else 1,
+        "mix": DEFAULT_MIX,
+        **summarize(samples, wall_s),
+    }
+    emit(report, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,15 @@
 # Unauthorized use, reproduction, or modification is strictly prohibited.
 
 import os
+import io
 import sys
+import hashlib
 import streamlit as st
 import pandas as pd
-import numpy as np
 import joblib
 import matplotlib.pyplot as plt
 from datetime import datetime
 import folium
-import json
 from streamlit_folium import folium_static
 
 # Fix module path
@@ -18,6 +18,68 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__) if "__file__" in globals
 sys.path.append(os.path.abspath(os.path.join(CURRENT_DIR, '..')))
 
 from src.data_cleaning import clean_data
+from api.model_utils import recommend_crops
+from src.trend_analysis import trend_statistics
+from src.geo import GEOJSON_PATH
+from src.topology import load_topologies, pick_level, to_geojson
+
+MODEL_PATH = "models/trained_model.pkl"
+BASE_YEAR_PATH = "models/base_year.txt"
+
+
+# --- Cached loaders (survive widget reruns) ---
+# The model/base-year loaders take the file's mtime as an argument, so a
+# retrained model on disk gets a fresh cache entry on the next rerun.
+@st.cache_resource(max_entries=1)
+def load_model(path, mtime):
+    return joblib.load(path)
+
+
+@st.cache_data(max_entries=1)
+def load_base_year(path, mtime):
+    with open(path) as f:
+        return int(f.read().strip())
+
+
+@st.cache_data(max_entries=4)
+def clean_upload(content_hash, _raw):
+    # Keyed on the upload's content hash; the raw bytes themselves aren't hashed
+    return clean_data(io.BytesIO(_raw))
+
+
+@st.cache_data(max_entries=4)
+def trend_table(content_hash, _df):
+    # Slope for every county/crop pair in one grouped pass, once per upload
+    return trend_statistics(_df).set_index(["county", "crop"])
+
+
+@st.cache_resource
+def county_topology():
+    # Quantized shared-arc county shapes, simplified for zooming in to ~8; parsed once per process
+    levels = load_topologies(GEOJSON_PATH)
+    return levels[pick_level(levels, 8)]
+
+
+@st.cache_data(max_entries=64)
+def crop_map_geojson(content_hash, crop, _avg_yield):
+    # A fresh FeatureCollection per (upload, crop); the shared topology is never mutated
+    county_yield_map = dict(zip(_avg_yield["county"], _avg_yield["avg_yield"]))
+    topology = county_topology()
+    values = [
+        {"avg_yield": round(county_yield_map.get(geom["properties"]["county"], 0.0), 2)}
+        for geom in topology["objects"]["counties"]["geometries"]
+    ]
+    return to_geojson(topology, values)
+
+
+@st.cache_data(max_entries=4)
+def evaluation_predictions(content_hash, model_mtime, base_year, _df, _model):
+    df_encoded = pd.get_dummies(_df, columns=["crop"], drop_first=True)
+    df_encoded["year_since_start"] = df_encoded["year"] - base_year
+    X_all = df_encoded[_model.feature_names_in_]
+    y_all = df_encoded["yield_ton_per_ha"]
+    return y_all.to_numpy(), _model.predict(X_all)
+
 
 st.set_page_config(page_title="🌾 MavunoWatch", layout="wide")
 st.title("🌾 MavunoWatch - Kenyan Crop Yield Intelligence System")
@@ -29,12 +91,15 @@ uploaded_file = st.sidebar.file_uploader("Upload CSV file", type=["csv"])
 
 if uploaded_file:
     try:
-        df = clean_data(uploaded_file)
+        raw = uploaded_file.getvalue()
+        upload_hash = hashlib.sha256(raw).hexdigest()
+        df = clean_upload(upload_hash, raw)
         st.success(f"✅ Data cleaned successfully. Records from Kenya: {len(df)}")
         st.dataframe(df.head(), use_container_width=True)
 
-        if os.path.exists("models/trained_model.pkl"):
-            model = joblib.load("models/trained_model.pkl")
+        if os.path.exists(MODEL_PATH):
+            model_mtime = os.path.getmtime(MODEL_PATH)
+            model = load_model(MODEL_PATH, model_mtime)
             st.sidebar.success("✅ AI model loaded!")
 
 
@@ -47,9 +112,8 @@ if uploaded_file:
             area_ha = st.number_input("Land Area (Ha)", min_value=1.0, value=10.0)
             year = datetime.now().year
 
-            if os.path.exists("models/base_year.txt"):
-                with open("models/base_year.txt") as f:
-                    base_year = int(f.read().strip())
+            if os.path.exists(BASE_YEAR_PATH):
+                base_year = load_base_year(BASE_YEAR_PATH, os.path.getmtime(BASE_YEAR_PATH))
             else:
                 base_year = 2000  # fallback, but should not happen
 
@@ -67,20 +131,12 @@ if uploaded_file:
 
             # --- Best Crop ---
             st.subheader("🏆 Best-Performing Crop Recommendation")
-            best_preds = []
-            
-            for c in crops:
-                row= {"year_since_start": year - base_year, "area_ha": area_ha}
-                for k in df["crop"].unique():
-                    row[f"crop_{k}"] = 1 if k == c else 0
-                try:
-                    row_df = pd.DataFrame([row])[model_features]
-                    yield_val= model.predict(row_df)[0]
-                    best_preds.append((c, yield_val))
-                except Exception :
-                    continue        
-            if best_preds:
-                sorted_df = pd.DataFrame(best_preds, columns=["Crop", "Predicted Yield"]).sort_values(by="Predicted Yield", ascending=False)
+            ranked = recommend_crops(
+                model, df[df["county"] == county][["county", "crop"]].drop_duplicates(),
+                year, area_ha, base_year
+            )
+            if not ranked.empty:
+                sorted_df = ranked.rename(columns={"crop": "Crop", "predicted_yield": "Predicted Yield"})[["Crop", "Predicted Yield"]]
                 top_crop = sorted_df.iloc[0]
                 st.success(f"🥇 **Recommended Crop** for {county}: **{top_crop['Crop']}** → **{round(top_crop['Predicted Yield'], 2)} tons/ha**")
                 st.bar_chart(sorted_df.set_index("Crop"))
@@ -99,7 +155,7 @@ if uploaded_file:
                 ax.set_ylabel("Yield (tons/ha)")
                 st.pyplot(fig)
 
-                slope = np.polyfit(trend_df["year"], trend_df["yield_ton_per_ha"], 1)[0]
+                slope = trend_table(upload_hash, df).loc[(county, trend_crop), "slope"]
                 if slope > 0.2:
                     st.info("📈 Yield is increasing. Good investment potential.")
                 elif slope < -0.2:
@@ -111,10 +167,7 @@ if uploaded_file:
 
             # --- Model Performance ---
             st.subheader("📊 Model Evaluation")
-            df_encoded = pd.get_dummies(df, columns=["crop"], drop_first=True)
-            X_all = df_encoded[model_features]
-            y_all = df_encoded["yield_ton_per_ha"]
-            y_pred_all = model.predict(X_all)
+            y_all, y_pred_all = evaluation_predictions(upload_hash, model_mtime, base_year, df, model)
 
             fig2, ax2 = plt.subplots()
             ax2.scatter(y_all, y_pred_all, alpha=0.5, color="blue")
@@ -130,18 +183,10 @@ if uploaded_file:
             filtered_df = df[df["crop"] == selected_crop]
             avg_yield = filtered_df.groupby("county")["yield_ton_per_ha"].mean().reset_index()
             avg_yield.columns = ["county", "avg_yield"]
-            avg_yield["county"] = avg_yield["county"].str.title().str.strip()
-
-            geo_path = "data/kenya-counties-simplified.geojson"
-            if os.path.exists(geo_path):
-                with open(geo_path, "r", encoding="utf-8") as f:
-                    geo_data = json.load(f)
+            avg_yield["county"] = avg_yield["county"].str.strip()
 
-                # Attach average yield to GeoJSON features
-                county_yield_map = dict(zip(avg_yield["county"], avg_yield["avg_yield"]))
-                for feature in geo_data["features"]:
-                    county_name = feature["properties"].get("shapeName", "").title().strip()
-                    feature["properties"]["avg_yield"] = round(county_yield_map.get(county_name, 0.0), 2)
+            if os.path.exists(GEOJSON_PATH):
+                geo_data = crop_map_geojson(upload_hash, selected_crop, avg_yield)
 
                 m = folium.Map(location=[0.02, 37.9], zoom_start=6)
 
@@ -149,7 +194,7 @@ if uploaded_file:
                     geo_data=geo_data,
                     data=avg_yield,
                     columns=["county", "avg_yield"],
-                    key_on="feature.properties.shapeName",
+                    key_on="feature.properties.county",
                     fill_color="YlGn",
                     fill_opacity=0.7,
                     line_opacity=0.2,
@@ -2,7 +2,12 @@ import streamlit as st
 import pandas as pd
 import folium
 from streamlit_folium import st_folium
-import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.topology import load_topologies, pick_level, to_geojson
 
 @st.cache_data
 def load_data():
@@ -25,11 +30,15 @@ selected_crop = st.selectbox("Select a crop to view:", all_crops)
 filtered_df = df[df["crop"] == selected_crop]
 grouped_df = filtered_df.groupby("county")["yield_ton_per_ha"].mean().reset_index()
 grouped_df.columns = ["county", "yield"]  # Rename for clarity
-grouped_df["county"] = grouped_df["county"].str.strip().str.title()  # Normalize
+grouped_df["county"] = grouped_df["county"].str.strip()  # Same spelling as the topology's properties.county
+
+# County shapes from the quantized topology (simplified for zoom <= 8), decoded once
+@st.cache_resource
+def load_county_geojson():
+    levels = load_topologies()
+    return to_geojson(levels[pick_level(levels, 8)])
 
-# Load GeoJSON
-with open("data/kenya-counties-simplified.geojson", "r", encoding="utf-8") as f:
-    kenya_geojson = json.load(f)
+kenya_geojson = load_county_geojson()
 
 # Create Map
 m = folium.Map(location=[0.0236, 37.9062], zoom_start=6)
@@ -39,7 +48,7 @@ folium.Choropleth(
     geo_data=kenya_geojson,
     data=grouped_df,
     columns=["county", "yield"],
-    key_on="feature.properties.shapeName",  # This is the key you confirmed exists
+    key_on="feature.properties.county",  # shapeName with the data's spelling (e.g. Tharaka Nithi)
     fill_color="YlGn",
     fill_opacity=0.7,
     line_opacity=0.2,
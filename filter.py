@@ -1,7 +1,17 @@
-import pandas as pd
+import sys
 
-df = pd.read_csv("data/hvstat_africa_data_v1.0.csv")
-kenya_df = df[df["country"] == "Kenya"]
+from src.data_cleaning import iter_filtered_chunks, stream_clean_data
 
-# Save filtered Kenya data
-kenya_df.to_csv("data/kenya_real.csv", index=False)
+SOURCE = "data/hvstat_africa_data_v1.0.csv"
+
+if "--clean" in sys.argv:
+    # Stream, filter and clean in one pass -> ready for training/serving
+    rows = stream_clean_data(SOURCE, "data/kenya_clean.csv")
+    print("✅ Saved", rows, "cleaned Kenya rows to data/kenya_clean.csv")
+else:
+    # Save filtered Kenya data (raw rows), reading the continental file in chunks
+    rows = 0
+    for chunk in iter_filtered_chunks(SOURCE, country="kenya", min_year=None):
+        chunk.to_csv("data/kenya_real.csv", mode="a" if rows else "w", header=not rows, index=False)
+        rows += len(chunk)
+    print("✅ Saved", rows, "Kenya rows to data/kenya_real.csv")
@@ -1,5 +1,14 @@
 const allCrops = [];
 let chartInstance = null;
+let metadataPromise = null;
+
+// 📦 One /metadata request per page, shared by every form that needs it
+function fetchMetadata() {
+  if (!metadataPromise) {
+    metadataPromise = fetch("http://127.0.0.1:5000/metadata").then(res => res.json());
+  }
+  return metadataPromise;
+}
 
 document.addEventListener("DOMContentLoaded", () => {
   const isTrendPage = document.getElementById("trendForm") !== null;
@@ -17,8 +26,7 @@ function setupPredictPage() {
   const predictForm = document.getElementById("predict-form");
   const resultDiv = document.getElementById("prediction-result");
 
-  fetch("http://127.0.0.1:5000/metadata")
-    .then(res => res.json())
+  fetchMetadata()
     .then(data => {
       data.counties.forEach(c => {
         predictCounty.innerHTML += `<option value="${c}">${c}</option>`;
@@ -72,8 +80,7 @@ if (document.getElementById("trendForm")) {
   const trendNote = document.getElementById("trendNote");
   const trendCanvas = document.getElementById("trendChart")?.getContext("2d");
 
-  fetch("http://127.0.0.1:5000/metadata")
-    .then(res => res.json())
+  fetchMetadata()
     .then(data => {
       data.counties.forEach(c => {
         trendCounty.innerHTML += `<option value="${c}">${c}</option>`;
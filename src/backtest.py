@@ -0,0 +1,205 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+Rolling-origin backtest of the training setup: for every harvest year Y
+with enough history, fit on years <= Y and score on the next year present
+in the data, so no fold ever trains on its own future.
+
+    python src/backtest.py                 # all cores -> models/backtest/
+    python src/backtest.py --workers 4 --trees 50
+
+Reads the same rows as training: the ingest store once it exists, else
+the cleaned CSV. The feature matrix is encoded once (as in train_model)
+and written to a .npy file that every worker memory-maps, so the pool
+shares one copy through the page cache instead of pickling it into each
+process. Reports:
+folds.csv (per fold errors plus fit/predict seconds), counties.csv,
+crops.csv and predictions.csv, plus summary.json.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+from src.model_training import (
+    DATA_PATH, MODELS_DIR, N_ESTIMATORS, atomic_write, encode_features, load_training_data, write_json,
+)
+
+BACKTEST_DIR = os.path.join(MODELS_DIR, "backtest")
+
+# Years of history the first fold trains on
+MIN_TRAIN_YEARS = 3
+
+# Worker-side views of the shared arrays, opened once per process
+_shared = {}
+
+
+def rolling_origin_folds(years, min_train_years=MIN_TRAIN_YEARS):
+    """[(train_end, test_year), ...]: train on years <= train_end, test on the next year present."""
+    years = sorted(set(int(y) for y in years))
+    return [(years[i], years[i + 1]) for i in range(min_train_years - 1, len(years) - 1)]
+
+
+def _open_shared(shared_dir):
+    for name in ("X", "y", "year"):
+        _shared[name] = np.load(os.path.join(shared_dir, f"{name}.npy"), mmap_mode="r")
+
+
+def _run_fold(fold, n_estimators, random_state):
+    from sklearn.ensemble import RandomForestRegressor
+
+    train_end, test_year = fold
+    X, y, year = _shared["X"], _shared["y"], _shared["year"]
+    # Rows are sorted by year, so both sets are contiguous views of the memmap
+    train = slice(0, int(np.searchsorted(year, train_end, side="right")))
+    test = slice(train.stop, int(np.searchsorted(year, test_year, side="right")))
+
+    # One core per fold; the pool provides the parallelism
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, n_jobs=1)
+    start = time.perf_counter()
+    model.fit(X[train], y[train])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    preds = model.predict(X[test])
+    predict_seconds = time.perf_counter() - start
+    return {
+        "train_end": train_end, "test_year": test_year, "n_train": train.stop,
+        "test_rows": (test.start, test.stop), "predicted": preds,
+        "fit_seconds": fit_seconds, "predict_seconds": predict_seconds,
+    }
+
+
+def error_table(predictions, by):
+    """n, RMSE, MAE and bias (mean predicted - actual) per group."""
+    err = predictions["predicted"] - predictions["actual"]
+    grouped = pd.DataFrame({
+        by: predictions[by], "err": err, "sq": err ** 2, "abs": err.abs(),
+    }).groupby(by, sort=True, observed=True)
+    table = pd.DataFrame({
+        "n": grouped.size(),
+        "rmse": np.sqrt(grouped["sq"].mean()),
+        "mae": grouped["abs"].mean(),
+        "bias": grouped["err"].mean(),
+    })
+    return table.reset_index()
+
+
+def run_backtest(df, n_estimators=N_ESTIMATORS, workers=None, min_train_years=MIN_TRAIN_YEARS,
+                 random_state=42):
+    """
+    Returns {"folds", "counties", "crops", "predictions"} frames. workers=None
+    uses every core; workers=1 runs the folds in this process.
+    """
+    folds = rolling_origin_folds(df["year"], min_train_years)
+    if not folds:
+        raise ValueError(f"❌ Need more than {min_train_years} harvest years to backtest.")
+
+    # Sorted by year so every fold's train/test rows are one slice. The forest
+    # works in float32 internally, so storing X that way lets fit() use the
+    # mapped pages without a converted copy per fold.
+    df = df.iloc[np.argsort(df["year"].to_numpy(), kind="stable")]
+    base_year = df["year"].min()
+    X, _, _ = encode_features(df, base_year)
+    X = X.astype(np.float32)
+    y = df["yield_ton_per_ha"].to_numpy(dtype=np.float64)
+    year = df["year"].to_numpy(dtype=np.int64)
+    workers = min(workers or os.cpu_count() or 1, len(folds))
+
+    shared_dir = tempfile.mkdtemp(prefix="mavuno-backtest-")
+    try:
+        for name, values in (("X", X), ("y", y), ("year", year)):
+            np.save(os.path.join(shared_dir, f"{name}.npy"), values)
+        del X
+
+        # Biggest training sets first so the slow folds don't finish last
+        order = sorted(folds, key=lambda f: -f[0])
+        args = (order, [n_estimators] * len(order), [random_state] * len(order))
+        if workers == 1:
+            _open_shared(shared_dir)
+            try:
+                results = list(map(_run_fold, *args))
+            finally:
+                _shared.clear()
+        else:
+            with ProcessPoolExecutor(workers, initializer=_open_shared, initargs=(shared_dir,)) as pool:
+                results = list(pool.map(_run_fold, *args))
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+    results.sort(key=lambda r: r["train_end"])
+    frames, fold_rows = [], []
+    for r in results:
+        rows = df.iloc[slice(*r["test_rows"])]
+        fold = pd.DataFrame({
+            "train_end": r["train_end"],
+            "county": rows["county"].to_numpy(),
+            "crop": rows["crop"].to_numpy(),
+            "year": rows["year"].to_numpy(),
+            "actual": rows["yield_ton_per_ha"].to_numpy(),
+            "predicted": r["predicted"],
+        })
+        err = fold["predicted"] - fold["actual"]
+        fold_rows.append({
+            "train_end": r["train_end"], "test_year": r["test_year"],
+            "n_train": r["n_train"], "n_test": len(fold),
+            "rmse": float(np.sqrt((err ** 2).mean())), "mae": float(err.abs().mean()),
+            "fit_seconds": r["fit_seconds"], "predict_seconds": r["predict_seconds"],
+        })
+        frames.append(fold)
+
+    predictions = pd.concat(frames, ignore_index=True)
+    return {
+        "folds": pd.DataFrame(fold_rows),
+        "counties": error_table(predictions, "county"),
+        "crops": error_table(predictions, "crop"),
+        "predictions": predictions,
+    }
+
+
+def save_report(report, out_dir=BACKTEST_DIR, **settings):
+    os.makedirs(out_dir, exist_ok=True)
+    for name, table in report.items():
+        atomic_write(os.path.join(out_dir, f"{name}.csv"), lambda p, t=table: t.to_csv(p, index=False))
+
+    err = report["predictions"]["predicted"] - report["predictions"]["actual"]
+    summary = {
+        **settings,
+        "folds": len(report["folds"]),
+        "rmse": float(np.sqrt((err ** 2).mean())),
+        "mae": float(err.abs().mean()),
+        "fit_seconds": float(report["folds"]["fit_seconds"].sum()),
+        "predict_seconds": float(report["folds"]["predict_seconds"].sum()),
+    }
+    atomic_write(os.path.join(out_dir, "summary.json"), write_json(summary))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--trees", type=int, default=N_ESTIMATORS)
+    parser.add_argument("--min-train-years", type=int, default=MIN_TRAIN_YEARS)
+    parser.add_argument("--out", default=BACKTEST_DIR)
+    opts = parser.parse_args()
+
+    started = time.perf_counter()
+    df, _ = load_training_data(opts.data)
+    result = run_backtest(df, opts.trees, opts.workers, opts.min_train_years)
+    totals = save_report(result, opts.out, n_estimators=opts.trees, min_train_years=opts.min_train_years)
+
+    with pd.option_context("display.width", 120, "display.max_columns", 10):
+        print(result["folds"].round(3).to_string(index=False))
+    print(f"📊 Backtest over {totals['folds']} folds: RMSE {totals['rmse']:.2f}, MAE {totals['mae']:.2f} "
+          f"({time.perf_counter() - started:.1f}s wall, {totals['fit_seconds']:.1f}s fitting) -> {opts.out}")
@@ -0,0 +1,138 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+Flat-array export of a fitted RandomForestRegressor plus a NumPy predictor.
+
+All trees' nodes are concatenated into one set of arrays (feature, threshold,
+left, right, value, missing_left) saved as .npy files, so loading is a few
+memory maps instead of unpickling the sklearn forest. Child indices are
+global and leaves point at themselves, which lets every tree be walked in
+lockstep, one vectorized step per depth level, without per-tree Python loops.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.utils import mkdtemp_shared
+
+ARRAYS = ["feature", "threshold", "left", "right", "value", "missing_left"]
+
+
+def export_forest(model, out_dir, version=None):
+    """Compile model.estimators_ into out_dir (replaced atomically)."""
+    trees = [est.tree_ for est in model.estimators_]
+    offsets = np.cumsum([0] + [t.node_count for t in trees])
+
+    parts = {name: [] for name in ARRAYS}
+    for offset, tree in zip(offsets, trees):
+        own = np.arange(tree.node_count, dtype=np.int64) + offset
+        leaf = tree.children_left < 0
+        parts["feature"].append(np.where(leaf, 0, tree.feature))
+        parts["threshold"].append(tree.threshold)
+        parts["left"].append(np.where(leaf, own, tree.children_left + offset))
+        parts["right"].append(np.where(leaf, own, tree.children_right + offset))
+        parts["value"].append(tree.value[:, 0, 0])
+        # Older sklearn versions have no missing-value routing; NaN then goes right
+        missing = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8))
+        parts["missing_left"].append(np.asarray(missing, dtype=bool) & ~leaf)
+
+    dtypes = {"feature": np.int32, "threshold": np.float64, "left": np.int32,
+              "right": np.int32, "value": np.float64, "missing_left": np.bool_}
+
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = mkdtemp_shared(dir=parent)
+    try:
+        for name in ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.concatenate(parts[name]).astype(dtypes[name]))
+        meta = {
+            "version": version,
+            "roots": offsets[:-1].tolist(),
+            "max_depth": int(max(t.max_depth for t in trees)),
+            "feature_names": [str(f) for f in model.feature_names_in_],
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(tmp_dir, out_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+class CompiledForest:
+    """
+    Drop-in for the sklearn forest's predict(): exposes feature_names_in_,
+    n_estimators and predict(X), giving bit-identical results to
+    RandomForestRegressor.predict with n_jobs=1.
+
+    Identical input rows are scored once, and big batches are walked
+    chunk_size rows at a time so the per-(row, tree) cursor arrays stay small.
+    """
+
+    def __init__(self, model_dir, mmap=True, chunk_size=256):
+        with open(os.path.join(model_dir, "meta.json")) as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode=mode))
+        self.version = meta["version"]
+        self.roots = np.asarray(meta["roots"], dtype=np.int64)
+        self.max_depth = meta["max_depth"]
+        self.feature_names_in_ = np.asarray(meta["feature_names"], dtype=object)
+        self.n_estimators = len(self.roots)
+        self.chunk_size = chunk_size
+
+    def predict(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_names_in_]
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) > 1:
+            X, inverse = np.unique(X, axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+        else:
+            inverse = None
+
+        preds = np.empty(len(X))
+        for start in range(0, len(X), self.chunk_size):
+            preds[start:start + self.chunk_size] = self._walk(X[start:start + self.chunk_size])
+        return preds if inverse is None else preds[inverse]
+
+    def _walk(self, X):
+        n, n_features = X.shape
+        flat_X = np.ascontiguousarray(X).ravel()
+        has_nan = bool(np.isnan(flat_X).any())
+
+        # One cursor per (row, tree); cursors are dropped once they hit a leaf
+        # (leaves point at themselves) so later steps only touch deep paths
+        node = np.tile(self.roots, n)
+        offset = np.repeat(np.arange(n, dtype=np.int64) * n_features, self.n_estimators)
+        slot = np.arange(n * self.n_estimators)
+        leaf = np.empty(n * self.n_estimators, dtype=np.int64)
+        for _ in range(self.max_depth + 1):
+            x = flat_X[offset + self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_left[node]
+            next_node = np.where(go_left, self.left[node], self.right[node])
+            done = next_node == node
+            leaf[slot[done]] = node[done]
+            active = ~done
+            node, offset, slot = next_node[active], offset[active], slot[active]
+            if len(node) == 0:
+                break
+
+        # Accumulate tree by tree, in order, to match sklearn's rounding
+        leaf_values = self.value[leaf].reshape(n, self.n_estimators)
+        total = np.zeros(n)
+        for t in range(self.n_estimators):
+            total += leaf_values[:, t]
+        return total / self.n_estimators
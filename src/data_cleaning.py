@@ -1,45 +1,363 @@
+import hashlib
+import os
+
 import pandas as pd
 import numpy as np
 
-def clean_data(file_path_or_buffer):
-    df = pd.read_csv(file_path_or_buffer)
+from src.instrumentation import stage_timer
+from src.utils import mkstemp_shared
+
+# Bump whenever clean_data's output changes so stale snapshots are ignored
+CLEANING_VERSION = "1"
+
+SNAPSHOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache"))
+
+# Raw HVStat columns clean_frame() cannot work without
+REQUIRED_COLUMNS = ["country", "admin_1", "product", "harvest_year", "area", "production"]
+
+RENAMES = {
+    "admin_1": "county",
+    "product": "crop",
+    "harvest_year": "year",
+    "area": "area_ha",
+    "production": "production_tons",
+}
+
+# Placeholder values clean_frame() turns into NaN
+JUNK_VALUES = ["none", "n/a", "nan", "null", "", " ", "-", "—", "all (ps)"]
+
+# Raw HVStat columns and the dtypes pd.read_csv infers for them on a
+# well-formed extract. The fast parse path declares these instead of
+# inferring; a file that doesn't fit them falls back to inference.
+HVSTAT_SCHEMA = {
+    "fnid": object,
+    "country": object,
+    "country_code": object,
+    "admin_1": object,
+    "admin_2": object,
+    "product": object,
+    "season_name": object,
+    "planting_year": np.int64,
+    "planting_month": np.int64,
+    "harvest_year": np.int64,
+    "harvest_month": np.int64,
+    "crop_production_system": object,
+    "qc_flag": np.int64,
+    "area": np.float64,
+    "production": np.float64,
+    "yield": np.float64,
+}
+# Numeric schema columns clean_frame() coerces, so junk there parses straight
+# to NaN. A junk value in any other numeric column doesn't parse and the file
+# takes the inference path, as clean_frame() would leave that column as text.
+JUNK_NA_COLUMNS = ["area", "production"]
+
+# Columns kept by the compact representation: what the API, training and the
+# weather merge actually read
+COMPACT_COLUMNS = [
+    "fnid", "county", "crop", "season_name", "crop_production_system",
+    "planting_year", "planting_month", "year", "harvest_month",
+    "area_ha", "production_tons", "yield_ton_per_ha",
+]
+# String dimensions stored as integer codes
+DIMENSION_COLUMNS = ["fnid", "county", "crop", "season_name", "crop_production_system"]
+# Left at float64: trends and the model target are computed from it
+FULL_PRECISION_COLUMNS = ["yield_ton_per_ha"]
+
+# column -> categories, shared by every frame compacted in this process so a
+# code means the same value everywhere. New values are appended, never
+# reordered, so existing codes stay valid.
+DICTIONARIES = {}
+
+
+def clean_data(file_path_or_buffer, compact=False, engine="c"):
+    """
+    Read and clean an HVStat CSV. Files matching HVSTAT_SCHEMA take the fast
+    path (read_hvstat + clean_parsed_frame); anything else is read with dtype
+    inference and cleaned by clean_frame(). Both give the same frame.
+    engine="pyarrow" parses the fast path with pyarrow's multithreaded reader;
+    its float parsing is correctly rounded, so values written with 17
+    significant digits can differ from the default parser in the last bit.
+    """
+    # compact=True only keeps COMPACT_COLUMNS, so skip parsing the rest
+    columns = None
+    if compact:
+        raw_names = {v: k for k, v in RENAMES.items()}
+        columns = ["country"] + [raw_names.get(c, c) for c in COMPACT_COLUMNS]
+
+    df = read_hvstat(file_path_or_buffer, columns, engine)
+    if df is not None:
+        df = clean_parsed_frame(df)
+    else:
+        with stage_timer("clean_data", "read"):
+            df = pd.read_csv(file_path_or_buffer)
+        df = clean_frame(df)
+
+    if df.empty:
+        raise ValueError("No data left after cleaning.")
+
+    if compact:
+        df = compact_frame(df)
+    return df
+
+
+def compact_frame(df, columns=COMPACT_COLUMNS, dictionaries=DICTIONARIES):
+    """
+    Memory-light copy of a cleaned frame: only `columns`, string dimensions
+    as categoricals over the shared dictionaries, integers downcast and other
+    measurements stored as float32 (about 7 significant digits, ample for
+    hectares and tonnes; the compact frame never derives values from them).
+    Masks and group-bys on the dimensions then run on integer codes
+    (pass observed=True to groupby).
+    """
+    out = {}
+    for col in [c for c in columns if c in df.columns]:
+        s = df[col]
+        if col in DIMENSION_COLUMNS:
+            categories = dictionaries.get(col, pd.Index([], dtype=object))
+            new = pd.Index(s.dropna().unique()).difference(categories).sort_values()
+            if len(new):
+                categories = dictionaries[col] = categories.append(new)
+            out[col] = pd.Categorical(s, categories=categories)
+        elif col in FULL_PRECISION_COLUMNS:
+            out[col] = s
+        elif pd.api.types.is_integer_dtype(s):
+            out[col] = pd.to_numeric(s, downcast="integer")
+        else:
+            # downcast="float" keeps float64 whenever float32 would round a value
+            out[col] = pd.to_numeric(s).astype(np.float32)
+    return pd.DataFrame(out, index=df.index)
+
+
+def code_mask(series, values):
+    """series.isin(values) for a compact column, compared as integer codes."""
+    codes = series.cat.categories.get_indexer(list(values))
+    return np.isin(series.cat.codes.to_numpy(), codes[codes >= 0])
+
 
+def clean_frame(df, country="kenya", min_year=2000):
     # Keep only Kenya
     if "country" in df.columns:
-        df = df[df["country"].str.lower() == "kenya"]
+        df = df[df["country"].str.lower() == country]
 
     # Normalize columns
     df.columns = df.columns.str.strip().str.lower()
-    df = df.rename(columns={
-        "admin_1": "county",
-        "product": "crop",
-        "harvest_year": "year",
-        "area": "area_ha",
-        "production": "production_tons"
-    })
+    df = df.rename(columns=RENAMES)
 
     # Filter by year
-    df = df[pd.to_numeric(df["year"], errors="coerce") >= 2000]
+    df = df[pd.to_numeric(df["year"], errors="coerce") >= min_year]
 
     # Clean junk
-    junk = ["none","n/a","nan","null","", " ", "-", "—", "all (ps)"]
-    df = df.replace(junk, np.nan).infer_objects()
+    with stage_timer("clean_data", "replace"):
+        df = df.replace(JUNK_VALUES, np.nan).infer_objects()
 
     # Drop rows missing critical fields
-    df.dropna(subset=["year","area_ha","production_tons","crop","county"], inplace=True)
+    with stage_timer("clean_data", "dropna"):
+        df.dropna(subset=["year","area_ha","production_tons","crop","county"], inplace=True)
 
     # Convert types
-    df["year"] = pd.to_numeric(df["year"])
-    df["area_ha"] = pd.to_numeric(df["area_ha"])
-    df["production_tons"] = pd.to_numeric(df["production_tons"])
+    with stage_timer("clean_data", "coercion"):
+        df["year"] = pd.to_numeric(df["year"])
+        df["area_ha"] = pd.to_numeric(df["area_ha"])
+        df["production_tons"] = pd.to_numeric(df["production_tons"])
 
     # Remove zero‐area rows
     df = df[df["area_ha"] > 0]
 
     # Compute yield
-    df["yield_ton_per_ha"] = df["production_tons"] / df["area_ha"]
+    with stage_timer("clean_data", "yield"):
+        df["yield_ton_per_ha"] = df["production_tons"] / df["area_ha"]
 
-    if df.empty:
-        raise ValueError("No data left after cleaning.")
+    return df
+
+
+def rewind(source):
+    """Seek a buffer back to its start; False if it can't be re-read."""
+    if isinstance(source, (str, os.PathLike)):
+        return True
+    if hasattr(source, "seekable") and source.seekable():
+        source.seek(0)
+        return True
+    return False
+
+
+def read_hvstat(source, columns=None, engine="c"):
+    """
+    Parse an HVStat CSV against HVSTAT_SCHEMA: only `columns` (default: all)
+    are read, with declared dtypes and JUNK_VALUES as NA markers in
+    JUNK_NA_COLUMNS. Returns None
+    when the file doesn't fit the schema (missing or differently spelled
+    required columns, a value that doesn't parse as its declared type); the
+    source is then rewound for the inference path.
+    """
+    if not rewind(source):
+        return None
+    with stage_timer("clean_data", "read"):
+        header = pd.read_csv(source, nrows=0).columns.tolist()
+        rewind(source)
+        if any(c not in header for c in REQUIRED_COLUMNS):
+            return None
+
+        usecols = [c for c in header if columns is None or c in columns]
+        # Strings parse into per-column dictionaries, so the string work in
+        # clean_parsed_frame() runs on unique values; they leave as objects
+        dtype = {
+            c: "category" if HVSTAT_SCHEMA[c] is object else HVSTAT_SCHEMA[c]
+            for c in usecols if c in HVSTAT_SCHEMA
+        }
+        try:
+            if engine == "pyarrow":
+                # pyarrow takes no per-column NA lists; junk in area/production
+                # then fails the float cast and falls back like other junk
+                df = pd.read_csv(source, usecols=usecols, dtype=dtype, engine="pyarrow")
+            else:
+                na_values = {c: JUNK_VALUES for c in JUNK_NA_COLUMNS if c in usecols}
+                df = pd.read_csv(source, usecols=usecols, dtype=dtype, na_values=na_values, engine=engine)
+        except ValueError:
+            rewind(source)
+            return None
+    return df
+
+
+def clean_parsed_frame(df, country="kenya", min_year=2000):
+    """
+    clean_frame() for a frame from read_hvstat(). Numeric columns already
+    have their final dtypes, so only string columns are normalized: the
+    country match and junk replacement run on each column's categories, and
+    the columns become plain object columns again (all-NaN ones inferred as
+    float, like clean_frame) only after the row filters.
+    """
+    with stage_timer("clean_data", "filter"):
+        names = df["country"].cat.categories
+        df = df[code_mask(df["country"], [n for n in names if n.lower() == country])]
+        df = df[df["harvest_year"] >= min_year]
+
+    with stage_timer("clean_data", "replace"):
+        for col in df.columns:
+            values = df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                junk = values.cat.categories.intersection(JUNK_VALUES)
+                values = values.cat.remove_categories(junk).astype(object)
+            elif values.dtype == object:
+                values = values.where(~values.isin(JUNK_VALUES))
+            else:
+                continue
+            df[col] = values.infer_objects()
+
+    df.columns = df.columns.str.strip().str.lower()
+    df = df.rename(columns=RENAMES)
+
+    with stage_timer("clean_data", "dropna"):
+        df = df.dropna(subset=["year", "area_ha", "production_tons", "crop", "county"])
+
+    df = df[df["area_ha"] > 0]
+
+    with stage_timer("clean_data", "yield"):
+        df["yield_ton_per_ha"] = df["production_tons"] / df["area_ha"]
+
+    return df
+
+
+def iter_filtered_chunks(source, country="kenya", min_year=2000, usecols=None, chunksize=100_000):
+    """
+    Read a (possibly continental) HVStat CSV in chunks, applying the column,
+    country and year filters inside the loop so only matching rows are kept.
+    Pass country=None / min_year=None to skip either filter.
+    """
+    if usecols is not None:
+        usecols = list(dict.fromkeys(list(usecols) + REQUIRED_COLUMNS))
+
+    for chunk in pd.read_csv(source, usecols=usecols, chunksize=chunksize):
+        if country is not None and "country" in chunk.columns:
+            chunk = chunk[chunk["country"].astype(str).str.lower() == country]
+        if min_year is not None and "harvest_year" in chunk.columns:
+            chunk = chunk[pd.to_numeric(chunk["harvest_year"], errors="coerce") >= min_year]
+        if not chunk.empty:
+            yield chunk
+
+
+def stream_clean_data(source, output_path, country="kenya", min_year=2000, usecols=None,
+                      chunksize=100_000):
+    """
+    Streaming counterpart of clean_data(): cleans each filtered chunk and
+    appends it to output_path (CSV), so peak memory is bounded by chunksize
+    rather than by the size of the input. Returns the number of rows written.
+    """
+    tmp_path = output_path + ".tmp"
+    rows = 0
+    try:
+        for chunk in iter_filtered_chunks(source, country, min_year, usecols, chunksize):
+            chunk = clean_frame(chunk, country, min_year)
+            if chunk.empty:
+                continue
+            chunk.to_csv(tmp_path, mode="a" if rows else "w", header=not rows, index=False)
+            rows += len(chunk)
+
+        if rows == 0:
+            raise ValueError("No data left after cleaning.")
+
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return rows
+
+
+def file_hash(file_path):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def snapshot_path(file_path, snapshot_dir=SNAPSHOT_DIR):
+    key = hashlib.sha256(f"{file_hash(file_path)}:{CLEANING_VERSION}".encode()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(snapshot_dir, f"{stem}-{key}.feather")
+
+
+def load_clean_data(file_path_or_buffer, snapshot_dir=SNAPSHOT_DIR, compact=False):
+    """
+    clean_data() backed by an on-disk Arrow/Feather snapshot keyed on the
+    source file's content hash and CLEANING_VERSION. Snapshots are written
+    uncompressed so later loads memory-map them instead of reparsing the CSV.
+    Buffers (e.g. Streamlit uploads) and installs without pyarrow fall back
+    to a plain clean_data() call. The snapshot always holds the full frame;
+    compact=True converts it on the way out.
+    """
+    if not isinstance(file_path_or_buffer, (str, os.PathLike)):
+        return clean_data(file_path_or_buffer, compact=compact)
+
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        return clean_data(file_path_or_buffer, compact=compact)
+
+    path = snapshot_path(file_path_or_buffer, snapshot_dir)
+    if os.path.exists(path):
+        try:
+            df = feather.read_table(path, memory_map=True).to_pandas()
+            return compact_frame(df) if compact else df
+        except (OSError, pa.ArrowInvalid):
+            pass  # Corrupt/partial snapshot -> rebuild below
+
+    df = clean_data(file_path_or_buffer)
+
+    # Write to a temp file and rename so concurrent readers never see half a file
+    tmp_path = None
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        fd, tmp_path = mkstemp_shared(dir=snapshot_dir)
+        os.close(fd)
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    except (OSError, pa.ArrowException) as e:
+        print("⚠️ Could not write clean-data snapshot:", e)
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-    return df
\ No newline at end of file
+    return compact_frame(df) if compact else df
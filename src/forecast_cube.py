@@ -0,0 +1,201 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+Materialized forecasts: predicted yield for every county × crop × future
+year × standard area bucket, computed in one predict call after training
+and stored as a single .npy array (models/forecast/) that the API
+memory-maps and indexes instead of running the model.
+
+    python src/forecast_cube.py        # rebuild for the current trained model
+
+Cells for crops a county has never grown are NaN, matching the candidates
+/recommend considers.
+"""
+
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+from src.utils import mkdtemp_shared
+
+FORECAST_DIR = os.path.join("models", "forecast")
+
+# Farm sizes (ha) the planning screens offer
+AREA_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 500, 1000]
+# Current year plus this many, like the frontend's year picker
+FORECAST_HORIZON = 5
+
+DIMS = ["county", "crop", "year", "area_ha"]
+
+
+def forecast_years(horizon=FORECAST_HORIZON):
+    start = datetime.now().year
+    return list(range(start, start + horizon + 1))
+
+
+def encode_grid(feature_names, crops, years, areas, base_year):
+    """Feature matrix for every (crop, year, area) combination, in C order."""
+    feature_names = list(feature_names)
+    col_index = {name: i for i, name in enumerate(feature_names)}
+    crop_i, year_i, area_i = np.meshgrid(
+        np.arange(len(crops)), np.arange(len(years)), np.arange(len(areas)), indexing="ij"
+    )
+    crop_i, year_i, area_i = crop_i.ravel(), year_i.ravel(), area_i.ravel()
+
+    X = np.zeros((len(crop_i), len(feature_names)), dtype=np.float64)
+    if "year_since_start" in col_index:
+        X[:, col_index["year_since_start"]] = np.asarray(years, dtype=np.float64)[year_i] - base_year
+    if "area_ha" in col_index:
+        X[:, col_index["area_ha"]] = np.asarray(areas, dtype=np.float64)[area_i]
+    # Crops without a column are the drop_first baseline -> all zeros
+    crop_cols = np.array([col_index.get(f"crop_{c}", -1) for c in crops], dtype=np.int64)[crop_i]
+    has_crop = crop_cols >= 0
+    X[np.nonzero(has_crop)[0], crop_cols[has_crop]] = 1.0
+    return X
+
+
+def build_forecast_cube(model, base_year, county_crops, years=None, areas=AREA_BUCKETS):
+    """
+    Returns (values, labels): values has shape (county, crop, year, area_ha)
+    and labels maps each dim name to its coordinate list. The model has no
+    county feature, so each (crop, year, area) is scored once and broadcast
+    over the counties that grow the crop.
+    """
+    years = list(years) if years is not None else forecast_years()
+    pairs = county_crops[["county", "crop"]].dropna().drop_duplicates()
+    counties = sorted(pairs["county"].astype(str).unique())
+    crops = sorted(pairs["crop"].astype(str).unique())
+
+    X = encode_grid(model.feature_names_in_, crops, years, areas, base_year)
+    preds = model.predict(pd.DataFrame(X, columns=model.feature_names_in_, copy=False))
+    by_crop = preds.reshape(len(crops), len(years), len(areas))
+
+    grown = np.zeros((len(counties), len(crops)), dtype=bool)
+    grown[
+        pd.Index(counties).get_indexer(pairs["county"].astype(str)),
+        pd.Index(crops).get_indexer(pairs["crop"].astype(str)),
+    ] = True
+    values = np.where(grown[:, :, None, None], by_crop[None], np.nan)
+
+    labels = {"county": counties, "crop": crops, "year": years, "area_ha": list(areas)}
+    return values, labels
+
+
+def save_forecast_cube(values, labels, out_dir=FORECAST_DIR, version=None):
+    """Write values.npy + meta.json into out_dir (replaced atomically)."""
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = mkdtemp_shared(dir=parent)
+    try:
+        np.save(os.path.join(tmp_dir, "values.npy"), values)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"version": version, "dims": DIMS, "labels": labels}, f)
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(tmp_dir, out_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def materialize_forecasts(model, base_year, county_crops, out_dir=FORECAST_DIR, version=None):
+    # Single-threaded predict: bit-identical to what the API computes per request
+    n_jobs = getattr(model, "n_jobs", None)
+    if n_jobs is not None:
+        model.set_params(n_jobs=1)
+    try:
+        values, labels = build_forecast_cube(model, base_year, county_crops)
+    finally:
+        if n_jobs is not None:
+            model.set_params(n_jobs=n_jobs)
+    save_forecast_cube(values, labels, out_dir, version)
+    print(f"🧊 Materialized {np.count_nonzero(~np.isnan(values))} forecasts "
+          f"({' × '.join(str(n) for n in values.shape)}) -> {out_dir}")
+    return values, labels
+
+
+class ForecastCube:
+    """Memory-mapped forecast cube with label -> index lookups."""
+
+    def __init__(self, cube_dir, mmap=True):
+        with open(os.path.join(cube_dir, "meta.json")) as f:
+            meta = json.load(f)
+        self.version = meta["version"]
+        self.labels = meta["labels"]
+        self.values = np.load(os.path.join(cube_dir, "values.npy"), mmap_mode="r" if mmap else None)
+        self.index = {dim: {v: i for i, v in enumerate(self.labels[dim])} for dim in DIMS}
+
+    def position(self, dim, value):
+        if dim == "year":
+            value = int(value)
+        elif dim == "area_ha":
+            value = float(value)
+            value = int(value) if value.is_integer() else value
+        i = self.index[dim].get(value)
+        if i is None:
+            raise KeyError(f"{dim}={value} is not in the forecast cube")
+        return i
+
+    def lookup(self, county, crop, year, area_ha):
+        """Forecast for one cell, or None when the county doesn't grow the crop."""
+        value = self.values[
+            self.position("county", county), self.position("crop", crop),
+            self.position("year", year), self.position("area_ha", area_ha),
+        ]
+        return None if np.isnan(value) else float(value)
+
+    def slice(self, **fixed):
+        """
+        Records for every cell matching the fixed coordinates (any of county,
+        crop, year, area_ha); omitted dims are returned in full. Empty cells
+        are skipped.
+        """
+        selectors = []
+        for dim in DIMS:
+            if fixed.get(dim) is not None:
+                selectors.append([self.position(dim, fixed[dim])])
+            else:
+                selectors.append(list(range(len(self.labels[dim]))))
+
+        block = np.asarray(self.values[np.ix_(*selectors)])
+        grid = np.meshgrid(*[np.asarray(s) for s in selectors], indexing="ij")
+        keep = ~np.isnan(block.ravel())
+        frame = pd.DataFrame({
+            dim: np.asarray(self.labels[dim], dtype=object)[g.ravel()[keep]]
+            for dim, g in zip(DIMS, grid)
+        })
+        frame["predicted_yield"] = block.ravel()[keep]
+        return frame
+
+
+def load_forecast_cube(cube_dir, version=None):
+    """The cube in cube_dir, or None if it is missing or built for another model version."""
+    if not os.path.exists(os.path.join(cube_dir, "meta.json")):
+        return None
+    cube = ForecastCube(cube_dir)
+    if version is not None and cube.version != version:
+        return None
+    return cube
+
+
+if __name__ == "__main__":
+    import joblib
+    # The same rows training saw: the ingest store once it exists, else the CSV
+    from src.model_training import load_training_data
+
+    with open(os.path.join("models", "manifest.json")) as f:
+        manifest_version = json.load(f)["version"]
+    with open(os.path.join("models", "base_year.txt")) as f:
+        trained_base_year = int(f.read().strip())
+    materialize_forecasts(
+        joblib.load(os.path.join("models", "trained_model.pkl")), trained_base_year,
+        load_training_data()[0][["county", "crop"]], version=manifest_version,
+    )
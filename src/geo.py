@@ -0,0 +1,171 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import json
+import os
+
+import numpy as np
+
+GEOJSON_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "kenya-counties-simplified.geojson"))
+
+# GeoJSON shapeName -> county name used in the HVStat yield data
+COUNTY_ALIASES = {"Tharaka": "Tharaka Nithi"}
+
+
+def load_counties(geojson_path=GEOJSON_PATH):
+    """
+    Returns a list of (county, polygons). Each polygon is a list of rings
+    (exterior first), each ring an (N, 2) array of lon/lat.
+    """
+    with open(geojson_path, "r", encoding="utf-8") as f:
+        geo_data = json.load(f)
+
+    counties = []
+    for feature in geo_data["features"]:
+        name = feature["properties"].get("shapeName", "").strip()
+        name = COUNTY_ALIASES.get(name, name)
+        geometry = feature["geometry"]
+        parts = geometry["coordinates"]
+        if geometry["type"] == "Polygon":
+            parts = [parts]
+        polygons = [[np.asarray(ring, dtype=np.float64)[:, :2] for ring in rings] for rings in parts]
+        counties.append((name, polygons))
+    return counties
+
+
+def ring_area_centroid(ring):
+    # Shoelace formula; returns signed area and centroid (lon, lat)
+    x, y = ring[:, 0], ring[:, 1]
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y1 - x1 * y
+    area = cross.sum() / 2.0
+    if area == 0:
+        return 0.0, (x.mean(), y.mean())
+    cx = ((x + x1) * cross).sum() / (6.0 * area)
+    cy = ((y + y1) * cross).sum() / (6.0 * area)
+    return area, (cx, cy)
+
+
+def county_centroids(geojson_path=GEOJSON_PATH):
+    """Area-weighted centroid of each county's outer rings -> {county: (lat, lon)}."""
+    centroids = {}
+    for name, polygons in load_counties(geojson_path):
+        total, cx, cy = 0.0, 0.0, 0.0
+        for rings in polygons:
+            area, (x, y) = ring_area_centroid(rings[0])
+            area = abs(area)
+            total += area
+            cx += x * area
+            cy += y * area
+        centroids[name] = (float(cy / total), float(cx / total))
+    return centroids
+
+
+class CountyResolver:
+    """
+    Vectorized lat/lon -> county lookup over the county polygons.
+
+    Edges are bucketed into horizontal latitude bands, so a point only
+    tests the edges whose y-range can cross its ray (crossing-number test,
+    ray towards +lon), and edges of polygons whose bounding box doesn't span
+    the point's longitude are dropped before the test. Ring parity is
+    counted per polygon, so holes and multi-part counties need no special
+    handling.
+    """
+
+    def __init__(self, geojson_path=GEOJSON_PATH, n_bands=2048):
+        counties = load_counties(geojson_path)
+        self.counties = [name for name, _ in counties]
+
+        x0, y0, x1, y1, edge_poly, poly_county, poly_bbox = [], [], [], [], [], [], []
+        for county_id, (_, polygons) in enumerate(counties):
+            for rings in polygons:
+                poly_id = len(poly_county)
+                poly_county.append(county_id)
+                outer = rings[0]
+                poly_bbox.append((outer[:, 0].min(), outer[:, 0].max(), outer[:, 1].min(), outer[:, 1].max()))
+                for ring in rings:
+                    nxt = np.roll(ring, -1, axis=0)
+                    x0.append(ring[:, 0]); y0.append(ring[:, 1])
+                    x1.append(nxt[:, 0]); y1.append(nxt[:, 1])
+                    edge_poly.append(np.full(len(ring), poly_id, dtype=np.int32))
+
+        x0, y0, x1, y1 = (np.concatenate(a) for a in (x0, y0, x1, y1))
+        edge_poly = np.concatenate(edge_poly)
+        # Horizontal edges never cross a horizontal ray
+        keep = y0 != y1
+        self.x0, self.y0, self.x1, self.y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+        self.edge_poly = edge_poly[keep]
+        self.poly_county = np.asarray(poly_county, dtype=np.int32)
+        self.poly_bbox = np.asarray(poly_bbox, dtype=np.float64)
+        self.n_polys = len(poly_county)
+
+        # Latitude bands -> edges whose y-range overlaps the band (CSR layout)
+        self.lat_min = float(self.poly_bbox[:, 2].min())
+        self.lat_max = float(self.poly_bbox[:, 3].max())
+        self.lon_min = float(self.poly_bbox[:, 0].min())
+        self.lon_max = float(self.poly_bbox[:, 1].max())
+        self.n_bands = n_bands
+        self.band_height = (self.lat_max - self.lat_min) / n_bands
+        lo = self.band_of(np.minimum(self.y0, self.y1))
+        hi = self.band_of(np.maximum(self.y0, self.y1))
+        spans = hi - lo + 1
+        edge_ids = np.repeat(np.arange(len(lo)), spans)
+        bands = np.repeat(lo, spans) + (np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans))
+        order = np.argsort(bands, kind="stable")
+        self.band_edges = edge_ids[order]
+        self.band_ptr = np.concatenate([[0], np.cumsum(np.bincount(bands, minlength=n_bands))])
+
+    def band_of(self, lat):
+        band = ((np.asarray(lat) - self.lat_min) / self.band_height).astype(np.int64)
+        return np.clip(band, 0, self.n_bands - 1)
+
+    def resolve_ids(self, lat, lon, chunk=20000):
+        """County index per point (into self.counties), -1 outside every county."""
+        lat = np.asarray(lat, dtype=np.float64).ravel()
+        lon = np.asarray(lon, dtype=np.float64).ravel()
+        result = np.full(len(lat), -1, dtype=np.int64)
+        for start in range(0, len(lat), chunk):
+            stop = start + chunk
+            result[start:stop] = self._resolve_chunk(lat[start:stop], lon[start:stop])
+        return result
+
+    def _resolve_chunk(self, lat, lon):
+        n = len(lat)
+        result = np.full(n, -1, dtype=np.int64)
+        inside_bbox = (
+            (lat >= self.lat_min) & (lat <= self.lat_max) & (lon >= self.lon_min) & (lon <= self.lon_max)
+        )
+        points = np.nonzero(inside_bbox)[0]
+        if len(points) == 0:
+            return result
+
+        # (point, edge) candidate pairs from each point's band
+        band = self.band_of(lat[points])
+        starts, counts = self.band_ptr[band], self.band_ptr[band + 1] - self.band_ptr[band]
+        pair_point = np.repeat(points, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        pair_edge = self.band_edges[np.repeat(starts, counts) + offsets]
+
+        px, py = lon[pair_point], lat[pair_point]
+        poly = self.edge_poly[pair_edge]
+        bbox = self.poly_bbox[poly]
+        x0, y0, x1, y1 = self.x0[pair_edge], self.y0[pair_edge], self.x1[pair_edge], self.y1[pair_edge]
+
+        # Bounding-box prefilter, then the half-open straddle + intersection test
+        candidate = (px >= bbox[:, 0]) & (px <= bbox[:, 1]) & ((y0 > py) != (y1 > py))
+        px, py, poly = px[candidate], py[candidate], poly[candidate]
+        x0, y0, x1, y1 = x0[candidate], y0[candidate], x1[candidate], y1[candidate]
+        crosses = px < x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+
+        # Odd number of crossings for a polygon -> the point is inside it
+        key = pair_point[candidate][crosses] * self.n_polys + poly[crosses]
+        keys, hits = np.unique(key, return_counts=True)
+        inside = keys[hits % 2 == 1]
+        result[inside // self.n_polys] = self.poly_county[inside % self.n_polys]
+        return result
+
+    def resolve(self, lat, lon):
+        """County name per point, None outside every county."""
+        ids = self.resolve_ids(lat, lon)
+        return [self.counties[i] if i >= 0 else None for i in ids]
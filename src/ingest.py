@@ -0,0 +1,347 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+Append-only ingestion of new harvest records.
+
+    python src/ingest.py --init            # build the store from data/kenya_only.csv
+    python src/ingest.py new_seasons.csv   # clean + append a delta CSV
+
+The store (data/store/) holds the cleaned dataset as Feather parts: part 0 is
+the initial full load, every ingested delta adds one more. Each part keeps a
+sorted array of record-key hashes for deduplication, and running
+per-(county, crop, year) sums/counts live in an aggregates file, so an ingest
+cleans, dedupes and aggregates only the delta rows. manifest.json is written
+last and names the live parts/aggregates; anything it doesn't list is ignored.
+"""
+
+import json
+import os
+import sys
+from bisect import insort
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+from src.data_cleaning import REQUIRED_COLUMNS, clean_frame, compact_frame, load_clean_data
+from src.trend_analysis import trend_note
+from src.utils import mkstemp_shared
+
+DATA_PATH = "data/kenya_only.csv"
+STORE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "store"))
+
+# One HVStat record: a unit's season/year for one crop and production system
+RECORD_KEY = ["fnid", "season_name", "year", "crop", "crop_production_system"]
+
+# Regression sums use year - YEAR_ORIGIN to keep the squared terms small
+YEAR_ORIGIN = 2000
+
+
+def cell_sums(df):
+    """Per-(county, crop, year) yield_sum, yield_count, area_sum and production_sum."""
+    return df.groupby(["county", "crop", "year"], observed=True).agg(
+        yield_sum=("yield_ton_per_ha", "sum"),
+        yield_count=("yield_ton_per_ha", "size"),
+        area_sum=("area_ha", "sum"),
+        production_sum=("production_tons", "sum"),
+    ).reset_index()
+
+
+def canonical_keys(df):
+    """
+    Rows with a year, stored as int64. A single blank year in a delta makes
+    the column float64, whose keys ("2000.0") would never match the stored
+    ones ("2000").
+    """
+    df = df.dropna(subset=["year"])
+    return df.astype({"year": np.int64})
+
+
+def record_keys(df):
+    cols = [c for c in RECORD_KEY if c in df.columns]
+    return pd.util.hash_pandas_object(df[cols].astype(str), index=False).to_numpy()
+
+
+class RunningAggregates:
+    """
+    Per-(county, crop, year) yield sums and counts, plus per-(county, crop)
+    least-squares sums over the yearly mean yields (the series /trend
+    plots). update() touches only the cells the new rows fall into.
+    """
+
+    def __init__(self):
+        # (county, crop, year) -> [yield_sum, yield_count, area_sum, production_sum]
+        self.cells = {}
+        # (county, crop) -> [n, sum_x, sum_y, sum_xx, sum_xy] over (year, mean yield)
+        self.regression = {}
+        # (county, crop) -> sorted years
+        self.years = {}
+
+    def _add_point(self, pair, year, mean, sign):
+        reg = self.regression.setdefault(pair, [0, 0, 0.0, 0, 0.0])
+        x = year - YEAR_ORIGIN
+        reg[0] += sign
+        reg[1] += sign * x
+        reg[2] += sign * mean
+        reg[3] += sign * x * x
+        reg[4] += sign * x * mean
+
+    def update(self, df):
+        for row in cell_sums(df).itertuples(index=False):
+            self._add_cell(row.county, row.crop, int(row.year), row.yield_sum, int(row.yield_count),
+                           row.area_sum, row.production_sum)
+
+    def _add_cell(self, county, crop, year, yield_sum, yield_count, area_sum, production_sum):
+        pair = (county, crop)
+        cell = self.cells.get((county, crop, year))
+        if cell is None:
+            cell = self.cells[(county, crop, year)] = [0.0, 0, 0.0, 0.0]
+            insort(self.years.setdefault(pair, []), year)
+        else:
+            # The year's mean moves, so swap its old point for the new one
+            self._add_point(pair, year, cell[0] / cell[1], -1)
+        cell[0] += float(yield_sum)
+        cell[1] += yield_count
+        cell[2] += float(area_sum)
+        cell[3] += float(production_sum)
+        self._add_point(pair, year, cell[0] / cell[1], 1)
+
+    def slope(self, county, crop):
+        n, sx, sy, sxx, sxy = self.regression[(county, crop)]
+        denom = n * sxx - sx * sx
+        if n < 2 or denom == 0:
+            return 0.0
+        return (n * sxy - sx * sy) / denom
+
+    def trend_entry(self, county, crop):
+        """Same shape as the entries of trend_analysis.build_trend_index()."""
+        trend = [
+            {"year": year, "yield_ton_per_ha": self.cells[(county, crop, year)][0] / self.cells[(county, crop, year)][1]}
+            for year in self.years[(county, crop)]
+        ]
+        slope = self.slope(county, crop)
+        return {"trend": trend, "slope": slope, "trend_note": trend_note(slope)}
+
+    def trend_index(self):
+        return {pair: self.trend_entry(*pair) for pair in self.years}
+
+    def cell_frame(self):
+        """
+        The cells as a frame laid out like cell_sums() of a compact frame:
+        county and crop are categoricals over the shared dictionaries.
+        """
+        keys = list(self.cells)
+        values = np.array(list(self.cells.values()), dtype=np.float64).reshape(-1, 4)
+        frame = pd.DataFrame({
+            "county": [k[0] for k in keys],
+            "crop": [k[1] for k in keys],
+            "year": np.array([k[2] for k in keys], dtype=np.int64),
+            "yield_sum": values[:, 0],
+            "yield_count": values[:, 1].astype(np.int64),
+            "area_sum": values[:, 2],
+            "production_sum": values[:, 3],
+        })
+        frame[["county", "crop"]] = compact_frame(frame, ["county", "crop"])
+        return frame
+
+    def save(self, path):
+        keys = list(self.cells)
+        values = np.array(list(self.cells.values()), dtype=np.float64).reshape(-1, 4)
+        pairs = list(self.regression)
+        np.savez(
+            path,
+            county=np.array([k[0] for k in keys], dtype=str),
+            crop=np.array([k[1] for k in keys], dtype=str),
+            year=np.array([k[2] for k in keys], dtype=np.int64),
+            values=values,
+            # Least-squares sums, so load() doesn't replay every cell to rebuild them
+            pair_county=np.array([p[0] for p in pairs], dtype=str),
+            pair_crop=np.array([p[1] for p in pairs], dtype=str),
+            regression=np.array([self.regression[p] for p in pairs], dtype=np.float64).reshape(-1, 5),
+        )
+
+    @classmethod
+    def load(cls, path):
+        aggregates = cls()
+        with np.load(path, allow_pickle=False) as data:
+            cells = zip(data["county"].tolist(), data["crop"].tolist(), data["year"].tolist(),
+                        data["values"].tolist())
+            if "regression" not in data.files:
+                # Written before the sums were stored: rebuild them cell by cell
+                for county, crop, year, (y_sum, y_count, a_sum, p_sum) in cells:
+                    aggregates._add_cell(county, crop, year, y_sum, int(y_count), a_sum, p_sum)
+                return aggregates
+
+            for county, crop, year, (y_sum, y_count, a_sum, p_sum) in cells:
+                aggregates.cells[(county, crop, year)] = [y_sum, int(y_count), a_sum, p_sum]
+                aggregates.years.setdefault((county, crop), []).append(year)
+            for years in aggregates.years.values():
+                years.sort()
+            for county, crop, (n, sx, sy, sxx, sxy) in zip(
+                data["pair_county"].tolist(), data["pair_crop"].tolist(), data["regression"].tolist()
+            ):
+                aggregates.regression[(county, crop)] = [int(n), int(sx), sy, int(sxx), sxy]
+        return aggregates
+
+    @classmethod
+    def from_frame(cls, df):
+        aggregates = cls()
+        aggregates.update(df)
+        return aggregates
+
+
+def manifest_path(store_dir=STORE_DIR):
+    return os.path.join(store_dir, "manifest.json")
+
+
+def read_manifest(store_dir=STORE_DIR):
+    with open(manifest_path(store_dir)) as f:
+        return json.load(f)
+
+
+def store_exists(store_dir=STORE_DIR):
+    return os.path.exists(manifest_path(store_dir))
+
+
+def atomic_save(path, write):
+    fd, tmp_path = mkstemp_shared(dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_part(df, keys, store_dir, part_no):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    name = f"part-{part_no:05d}"
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    atomic_save(os.path.join(store_dir, name + ".feather"),
+                lambda p: feather.write_feather(table, p, compression="uncompressed"))
+
+    def save_keys(p):
+        with open(p, "wb") as f:
+            np.save(f, np.sort(keys))
+    atomic_save(os.path.join(store_dir, name + ".keys.npy"), save_keys)
+    return name
+
+
+def commit_manifest(store_dir, manifest, aggregates):
+    # Aggregates are versioned by part count so the manifest swap is the single commit point
+    name = f"aggregates-{len(manifest['parts']):05d}.npz"
+
+    def save_aggregates(p):
+        with open(p, "wb") as f:
+            aggregates.save(f)
+    atomic_save(os.path.join(store_dir, name), save_aggregates)
+
+    previous = manifest.get("aggregates")
+    manifest["aggregates"] = name
+
+    def save_manifest(p):
+        with open(p, "w") as f:
+            json.dump(manifest, f, indent=2)
+    atomic_save(manifest_path(store_dir), save_manifest)
+    if previous and previous != name:
+        os.remove(os.path.join(store_dir, previous))
+
+
+def init_store(source_path=DATA_PATH, store_dir=STORE_DIR):
+    """Seed the store with the full cleaned source CSV (the one full pass)."""
+    df = canonical_keys(load_clean_data(source_path))
+    os.makedirs(store_dir, exist_ok=True)
+    part = write_part(df, record_keys(df), store_dir, 0)
+    manifest = {
+        "source": os.path.basename(source_path),
+        "columns": df.columns.tolist(),
+        "parts": [part],
+        "rows": len(df),
+        "next_index": int(df.index.max()) + 1 if len(df) else 0,
+    }
+    commit_manifest(store_dir, manifest, RunningAggregates.from_frame(df))
+    print(f"✅ Initialized store with {len(df)} rows at {store_dir}")
+    return manifest
+
+
+def load_store(store_dir=STORE_DIR):
+    """Cleaned dataset (all parts, memory-mapped) and its running aggregates."""
+    import pyarrow.feather as feather
+
+    manifest = read_manifest(store_dir)
+    frames = [
+        feather.read_table(os.path.join(store_dir, part + ".feather"), memory_map=True).to_pandas()
+        for part in manifest["parts"]
+    ]
+    df = pd.concat(frames) if len(frames) > 1 else frames[0]
+    aggregates = RunningAggregates.load(os.path.join(store_dir, manifest["aggregates"]))
+    return df, aggregates
+
+
+def load_aggregates(store_dir=STORE_DIR):
+    """The store's running aggregates and manifest, without reading any row parts."""
+    manifest = read_manifest(store_dir)
+    return RunningAggregates.load(os.path.join(store_dir, manifest["aggregates"])), manifest
+
+
+def seen_keys(keys, store_dir, parts):
+    seen = np.zeros(len(keys), dtype=bool)
+    for part in parts:
+        stored = np.load(os.path.join(store_dir, part + ".keys.npy"), mmap_mode="r")
+        if len(stored) == 0:
+            continue
+        pos = np.minimum(np.searchsorted(stored, keys), len(stored) - 1)
+        seen |= stored[pos] == keys
+    return seen
+
+
+def ingest_delta(delta_path_or_buffer, store_dir=STORE_DIR):
+    """
+    Validate, clean and append the new rows of a delta CSV. Rows whose record
+    key (fnid, season, year, crop, production system) is already stored, or
+    repeats within the delta, are dropped. Returns the number of rows added.
+    """
+    raw = pd.read_csv(delta_path_or_buffer)
+    missing = [c for c in REQUIRED_COLUMNS + ["fnid", "season_name"] if c not in raw.columns]
+    if missing:
+        raise ValueError(f"Delta is missing columns: {', '.join(missing)}")
+
+    delta = canonical_keys(clean_frame(raw))
+    keys = record_keys(delta)
+    fresh = ~pd.Series(keys).duplicated().to_numpy()
+
+    manifest = read_manifest(store_dir)
+    fresh &= ~seen_keys(keys, store_dir, manifest["parts"])
+    delta, keys = delta[fresh], keys[fresh]
+    print(f"🧹 Delta: {len(raw)} raw rows, {len(delta)} new after cleaning and dedupe")
+    if delta.empty:
+        return 0
+
+    delta = delta.reindex(columns=manifest["columns"])
+    delta.index = pd.RangeIndex(manifest["next_index"], manifest["next_index"] + len(delta))
+
+    aggregates = RunningAggregates.load(os.path.join(store_dir, manifest["aggregates"]))
+    aggregates.update(delta)
+
+    manifest["parts"].append(write_part(delta, keys, store_dir, len(manifest["parts"])))
+    manifest["rows"] += len(delta)
+    manifest["next_index"] += len(delta)
+    commit_manifest(store_dir, manifest, aggregates)
+    print(f"✅ Appended {len(delta)} rows ({manifest['rows']} total)")
+    return len(delta)
+
+
+if __name__ == "__main__":
+    if "--init" in sys.argv:
+        init_store()
+    elif len(sys.argv) > 1:
+        if not store_exists():
+            init_store()
+        ingest_delta(sys.argv[1])
+    else:
+        print("Usage: python src/ingest.py --init | <delta.csv>")
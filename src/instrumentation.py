@@ -0,0 +1,118 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+Lightweight in-process metrics: fixed-bucket histograms rendered in the
+Prometheus text format, plus optional structured (JSON) log lines.
+
+Observing a value is a dict lookup and a bisect under a lock, so timers can
+sit on hot paths. Metrics are per process; under the preforking server each
+worker reports its own numbers.
+
+Set MAVUNO_METRICS_LOG=1 to also emit one JSON log line per observation on
+the "mavuno.metrics" logger.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+logger = logging.getLogger("mavuno.metrics")
+# Metrics lines only go to this logger's own handler, never the app's log handlers
+logger.propagate = False
+if os.environ.get("MAVUNO_METRICS_LOG") == "1" and not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+REGISTRY = []
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels tuple -> [bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "metric": self.name,
+                "value": round(value, 6),
+                **dict(zip(self.label_names, label_values)),
+            }))
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+
+        for label_values, values in sorted(series.items()):
+            labels = ",".join(
+                f'{k}="{escape_label(v)}"' for k, v in zip(self.label_names, label_values)
+            )
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            cumulative += values[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+HTTP_LATENCY = Histogram(
+    "mavuno_http_request_duration_seconds", "Flask request latency by route.",
+    ["route", "method", "status"],
+)
+STAGE_LATENCY = Histogram(
+    "mavuno_stage_duration_seconds", "Pipeline stage latency (clean_data, train_model).",
+    ["pipeline", "stage"],
+)
+INFERENCE_BATCH_SIZE = Histogram(
+    "mavuno_inference_batch_rows", "Rows per model predict call.",
+    ["model"], buckets=SIZE_BUCKETS,
+)
+
+
+@contextmanager
+def stage_timer(pipeline, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, pipeline, stage)
+
+
+def render_prometheus():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
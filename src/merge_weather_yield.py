@@ -1,29 +1,40 @@
+import os
+import sys
+
 import pandas as pd
 
-# Load yield data
-yield_df = pd.read_csv("data/kenya_only.csv")
-yield_df = yield_df[yield_df["county"].str.lower() == "kisumu"]
-yield_df = yield_df[yield_df["harvest_year"] >= 2000]
-yield_df = yield_df.dropna(subset=["yield"])
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_cleaning import load_clean_data
+from src.weather_features import build_season_features
+from src.weather_store import STORE_DIR, WeatherStore, build_store, store_exists
 
-# Create month column (if not available, you can assume harvest happens in a specific month, like October)
-yield_df["month"] = 10  # Or adjust based on your logic
+COUNTY_WEATHER_PATH = "data/county_weather_2000_2023.csv"
+KISUMU_WEATHER_PATH = "data/kisumu_weather_2000_2023.csv"
 
-# Load weather data
-weather_df = pd.read_csv("data/kisumu_weather_2000_2023.csv")
+# Load cleaned yield data (all counties, all seasons)
+yield_df = load_clean_data("data/kenya_only.csv")
 
-# Merge on year and month
-merged_df = pd.merge(
-    yield_df,
-    weather_df,
-    left_on=["harvest_year", "month"],
-    right_on=["year", "month"],
-    how="left"
-)
+# Load weather: every county from the memory-mapped store, (re)built from the
+# fetcher CSV (src/weather_fetcher.py) when that is newer; else Kisumu only
+if os.path.exists(COUNTY_WEATHER_PATH):
+    meta_path = os.path.join(STORE_DIR, "meta.json")
+    if not store_exists() or os.path.getmtime(COUNTY_WEATHER_PATH) > os.path.getmtime(meta_path):
+        weather = build_store(pd.read_csv(COUNTY_WEATHER_PATH))
+    else:
+        weather = WeatherStore()
+elif store_exists():
+    weather = WeatherStore()
+else:
+    weather = pd.read_csv(KISUMU_WEATHER_PATH)
+    weather["county"] = "Kisumu"
+    yield_df = yield_df[yield_df["county"] == "Kisumu"]
 
-# Drop duplicate year col
-merged_df.drop(columns=["year"], inplace=True)
+# Aggregate weather over each row's planting -> harvest window
+features = build_season_features(yield_df, weather)
+merged_df = yield_df.join(features)
 
 # Save the merged dataset
 merged_df.to_csv("data/yield_with_weather.csv", index=False)
 print("✅ Merged data saved to: data/yield_with_weather.csv")
+print("🌦️ Rows with full season weather:", int(features["season_months"].notna().sum()), "of", len(features))
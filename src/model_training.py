@@ -4,19 +4,32 @@
 """
 Retrains the MavunoWatch model with weather features (precip_mm, temp_C).
 
-• Reads cleaned yield data via src.data_cleaning.clean_data  
-• Reads weather CSV (monthly), aggregates to yearly averages  
-• Merges on county + year  (drops rows without weather)  
-• One-hot encodes crop + crop_production_system  
-• Trains RandomForestRegressor  
-• Saves model -> models/trained_model.pkl  
+• Reads cleaned yield data from the append-only store (src/ingest.py) when
+  it exists, so ingested deltas reach the model; otherwise via
+  src.data_cleaning.load_clean_data (snapshot-cached)
+• Reads weather CSV (monthly), aggregates to yearly averages
+• Merges on county + year  (drops rows without weather)
+• One-hot encodes crop + crop_production_system
+• Trains RandomForestRegressor on all cores
+• Saves model -> models/trained_model.pkl (+ versioned copy and manifest)
+• Compiles the forest to flat arrays -> models/forest/ (used by the API)
+• Materializes county × crop × year × area forecasts -> models/forecast/
 • Saves base_year  -> models/base_year.txt
+
+Incremental mode (`python src/model_training.py --incremental`) reuses the
+cached feature matrix for rows seen before, encodes only the new ones and
+grows the previous forest with extra warm-started trees. The holdout is
+recorded in the cache and kept across runs, so metrics stay out-of-sample;
+the forest is refit from scratch once it would pass MAX_TREES, or when the
+features or base year change.
 """
 print("🚀 Starting model training script...")  # <-- sanity check
- 
+
 
 import sys
 import os
+import json
+from datetime import datetime, timezone
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import numpy as np
@@ -25,16 +38,37 @@ from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 import joblib
-from src.data_cleaning import clean_data
+from src.data_cleaning import load_clean_data, file_hash
+from src.compiled_forest import export_forest
+from src.forecast_cube import materialize_forecasts
+from src.ingest import STORE_DIR, load_store, manifest_path, store_exists
+from src.instrumentation import stage_timer
+from src.utils import mkstemp_shared
 
-def train_model():
-    df = clean_data("data/kenya_only.csv")
+DATA_PATH = "data/kenya_only.csv"
+MODELS_DIR = "models"
+MODEL_PATH = os.path.join(MODELS_DIR, "trained_model.pkl")
+BASE_YEAR_PATH = os.path.join(MODELS_DIR, "base_year.txt")
+MANIFEST_PATH = os.path.join(MODELS_DIR, "manifest.json")
+FEATURE_CACHE_PATH = os.path.join(MODELS_DIR, "feature_cache.npz")
+FOREST_DIR = os.path.join(MODELS_DIR, "forest")
+FORECAST_DIR = os.path.join(MODELS_DIR, "forecast")
 
-    if df.empty:
-        raise ValueError("❌ No data available after preprocessing.")
+N_ESTIMATORS = 100
+# Trees added per incremental run
+EXTRA_TREES = 20
+# Incremental runs that would grow the forest past this refit it from scratch
+MAX_TREES = 200
+TEST_SIZE = 0.2
 
-    # Normalize time
-    base_year = df["year"].min()
+
+def encode_features(df, base_year):
+    """
+    One-hot encode df the way the model is trained. Returns (X, feature_cols,
+    dummy_cols); dummy_cols also names the drop_first baselines, so rows
+    encoded later can tell a baseline category from a genuinely new one.
+    """
+    df = df.copy()
     df["year_since_start"] = df["year"] - base_year
 
     # One-hot encode categorical features
@@ -45,6 +79,7 @@ def train_model():
         cols_to_encode.append("crop_production_system")
 
     df_encoded = pd.get_dummies(df, columns=cols_to_encode, drop_first=True)
+    dummy_cols = [f"{c}_{v}" for c in cols_to_encode for v in df[c].dropna().unique()]
 
     # Build list of features to use
     feature_cols = ["year_since_start", "area_ha"]
@@ -57,44 +92,284 @@ def train_model():
 
     # ➕ Add encoded crop/system features
     feature_cols += [
-        col for col in df_encoded.columns 
+        col for col in df_encoded.columns
         if col.startswith("crop_") or col.startswith("crop_production_system_")
     ]
 
+    return df_encoded[feature_cols].to_numpy(dtype=np.float64), feature_cols, dummy_cols
+
+
+def encode_new_rows(df, base_year, feature_cols, dummy_cols):
+    """
+    Encode rows against an existing feature list: known categories line up
+    with their columns (the baseline stays all zeros) and unseen categories
+    are appended as new columns. Returns (X, feature_cols, dummy_cols).
+    """
+    df = df.copy()
+    df["year_since_start"] = df["year"] - base_year
+    cols_to_encode = [c for c in ("crop", "crop_production_system") if c in df.columns]
+    df_encoded = pd.get_dummies(df, columns=cols_to_encode)
+
+    seen = set(dummy_cols)
+    new_cols = [
+        f"{c}_{v}" for c in cols_to_encode for v in df[c].dropna().unique()
+        if f"{c}_{v}" not in seen
+    ]
+    feature_cols = list(feature_cols) + new_cols
+    X = df_encoded.reindex(columns=feature_cols, fill_value=0)
+    return X.to_numpy(dtype=np.float64), feature_cols, list(dummy_cols) + new_cols
+
+
+def baseline_crop(feature_cols, dummy_cols):
+    """
+    The crop encoded as all zeros: its dummy was dropped by drop_first, so it
+    has no feature column. Incremental runs append columns for new crops but
+    never move the baseline, whatever order the crops sort in.
+    """
+    columns = set(feature_cols)
+    for col in dummy_cols:
+        if col.startswith("crop_") and not col.startswith("crop_production_system_") \
+                and col not in columns:
+            return col[len("crop_"):]
+    return None
+
+
+def row_keys(df):
+    # Content hash per row: unchanged rows keep their key across data refreshes
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def load_feature_cache(path=FEATURE_CACHE_PATH):
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as cache:
+        return {
+            "keys": cache["keys"],
+            "X": cache["X"],
+            "feature_cols": cache["feature_cols"].tolist(),
+            "dummy_cols": cache["dummy_cols"].tolist(),
+            "base_year": int(cache["base_year"]),
+            # Caches written before the holdout was recorded have none
+            "holdout": cache["holdout"] if "holdout" in cache.files else None,
+        }
+
+
+def save_feature_cache(keys, X, feature_cols, dummy_cols, base_year, holdout, path=FEATURE_CACHE_PATH):
+    np.savez(
+        path, keys=keys, X=X, base_year=base_year, holdout=holdout,
+        feature_cols=np.array(feature_cols), dummy_cols=np.array(dummy_cols)
+    )
+
+
+def fixed_holdout(keys, cache, test_size=TEST_SIZE):
+    """
+    Holdout mask for an incremental run. A row key keeps the side it was on
+    (held out only if no copy of it was ever trained on), and keys new in this
+    run are assigned by hash, so warm-started trees are never scored on rows
+    they were fit on.
+    """
+    cached_keys, inverse = np.unique(cache["keys"], return_inverse=True)
+    trained = np.zeros(len(cached_keys), dtype=bool)
+    trained[inverse.ravel()[~cache["holdout"]]] = True
+
+    pos = pd.Index(cached_keys).get_indexer(keys)
+    holdout = (keys % 1000) < int(test_size * 1000)
+    seen = pos >= 0
+    holdout[seen] = ~trained[pos[seen]]
+    return holdout
+
+
+def previous_base_year(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get("base_year")
+
+
+def build_feature_matrix(df, base_year, cache=None):
+    """
+    Returns (X, feature_cols, dummy_cols, keys, n_new). With a cache built for
+    the same base_year, cached rows are reused as-is and only unseen rows are
+    encoded.
+    """
+    keys = row_keys(df)
+    if cache is None or cache["base_year"] != base_year:
+        X, feature_cols, dummy_cols = encode_features(df, base_year)
+        return X, feature_cols, dummy_cols, keys, len(df)
+
+    # Identical rows share a key (and an encoding), so index unique keys only
+    cached_keys, first = np.unique(cache["keys"], return_index=True)
+    pos = pd.Index(cached_keys).get_indexer(keys)
+    is_new = pos < 0
+
+    new_X, feature_cols, dummy_cols = encode_new_rows(
+        df[is_new], base_year, cache["feature_cols"], cache["dummy_cols"]
+    )
+
+    # New categories are appended, so cached rows fill the leading columns
+    X = np.zeros((len(df), len(feature_cols)), dtype=np.float64)
+    X[~is_new, :len(cache["feature_cols"])] = cache["X"][first[pos[~is_new]]]
+    X[is_new] = new_X
+    return X, feature_cols, dummy_cols, keys, int(is_new.sum())
+
+
+def atomic_write(path, write):
+    # Write to a temp file next to path, then rename over it
+    fd, tmp_path = mkstemp_shared(dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_json(obj):
+    def write(path):
+        with open(path, "w") as f:
+            json.dump(obj, f, indent=2)
+    return write
+
+
+def save_model_artifact(model, feature_cols, base_year, data_hash, metrics, dummy_cols=()):
+    """
+    Write a versioned model + manifest, then atomically repoint
+    trained_model.pkl. The manifest records dummy_cols and the baseline crop
+    so the API can tell which crops the model encodes.
+    """
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    os.makedirs(MODELS_DIR, exist_ok=True)
+
+    versioned_path = os.path.join(MODELS_DIR, f"trained_model-{version}.pkl")
+    joblib.dump(model, versioned_path)
+
+    manifest = {
+        "version": version,
+        "model_path": os.path.basename(versioned_path),
+        "data_hash": data_hash,
+        "feature_names": list(feature_cols),
+        "dummy_cols": list(dummy_cols),
+        "baseline_crop": baseline_crop(feature_cols, dummy_cols),
+        "base_year": int(base_year),
+        "n_estimators": int(model.n_estimators),
+        "metrics": metrics,
+    }
+    write_json(manifest)(os.path.join(MODELS_DIR, f"trained_model-{version}.json"))
+
+    atomic_write(MODEL_PATH, lambda p: joblib.dump(model, p))
+    # Compiled copy for low-latency serving; tagged so loaders can spot a stale one
+    export_forest(model, FOREST_DIR, version)
+    atomic_write(MANIFEST_PATH, write_json(manifest))
+
+    return manifest
+
+
+def load_training_data(data_path=DATA_PATH, store_dir=STORE_DIR):
+    """
+    (cleaned rows, data_hash). The default source reads the store instead of
+    the CSV once the store exists: it holds the CSV plus every ingested delta,
+    appended in order, so the feature cache still lines up with earlier runs.
+    """
+    if data_path == DATA_PATH and store_exists(store_dir):
+        df, _ = load_store(store_dir)
+        return df, file_hash(manifest_path(store_dir))
+    return load_clean_data(data_path), file_hash(data_path)
+
+
+def train_model(incremental=False, extra_trees=EXTRA_TREES, data_path=DATA_PATH):
+    df, data_hash = load_training_data(data_path)
+
+    if df.empty:
+        raise ValueError("❌ No data available after preprocessing.")
+
+    # Normalize time
+    base_year = df["year"].min()
+
+    cache = load_feature_cache() if incremental else None
+    with stage_timer("train_model", "encode"):
+        X, feature_cols, dummy_cols, keys, n_new = build_feature_matrix(df, base_year, cache)
+    print(f"🧮 Encoded {n_new} new rows ({len(df) - n_new} reused from cache)")
+
+    if incremental and cache is not None and n_new == 0:
+        print("✅ No new rows since the last training run; model left unchanged.")
+        return None
+
     # Target column
-    if "yield_ton_per_ha" not in df_encoded.columns:
+    if "yield_ton_per_ha" not in df.columns:
         raise ValueError("❌ 'yield_ton_per_ha' column missing in data.")
-    
-    X = df_encoded[feature_cols]
-    y = df_encoded["yield_ton_per_ha"]
 
-    # Train-test split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
+    y = df["yield_ton_per_ha"].to_numpy()
+    X = pd.DataFrame(X, columns=feature_cols)
+
+    if incremental and cache is not None and cache["holdout"] is not None:
+        # Same holdout as earlier runs, so the metrics stay out-of-sample
+        holdout = fixed_holdout(keys, cache)
+        X_train, X_test, y_train, y_test = X[~holdout], X[holdout], y[~holdout], y[holdout]
+    else:
+        # Random train-test split (quick sanity check; src/backtest.py evaluates by harvest year)
+        X_train, X_test, y_train, y_test, _, test_idx = train_test_split(
+            X, y, np.arange(len(X)), test_size=TEST_SIZE, random_state=42
+        )
+        holdout = np.zeros(len(X), dtype=bool)
+        holdout[test_idx] = True
+
+    # Grow the previous forest when it was fit on the same features and base year
+    model = None
+    if incremental and os.path.exists(MODEL_PATH):
+        previous = joblib.load(MODEL_PATH)
+        if list(getattr(previous, "feature_names_in_", [])) != list(feature_cols):
+            print("⚠️ Feature set changed; refitting from scratch")
+        elif previous_base_year() != base_year:
+            print("⚠️ Base year changed; refitting from scratch")
+        elif cache is None or cache["holdout"] is None:
+            print("⚠️ No recorded holdout for the previous model; refitting from scratch")
+        elif previous.n_estimators + extra_trees > MAX_TREES:
+            print(f"⚠️ Forest would pass {MAX_TREES} trees; refitting from scratch")
+        else:
+            model = previous
+            model.set_params(
+                warm_start=True, n_jobs=-1,
+                n_estimators=model.n_estimators + extra_trees
+            )
+            print(f"🌲 Growing forest to {model.n_estimators} trees")
 
     # Train model
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
-    model.fit(X_train, y_train)
+    if model is None:
+        model = RandomForestRegressor(n_estimators=N_ESTIMATORS, random_state=42, n_jobs=-1)
+    with stage_timer("train_model", "fit"):
+        model.fit(X_train, y_train)
 
     # Evaluate
-    preds = model.predict(X_test)
-    rmse = np.sqrt(mean_squared_error(y_test, preds))
-    mae = mean_absolute_error(y_test, preds)
+    with stage_timer("train_model", "evaluate"):
+        preds = model.predict(X_test)
+        rmse = np.sqrt(mean_squared_error(y_test, preds))
+        mae = mean_absolute_error(y_test, preds)
 
     print("📊 Model Evaluation:")
     print("✅ RMSE:", round(rmse, 2))
     print("✅ MAE :", round(mae, 2))
 
-    # Save model
-    os.makedirs("models", exist_ok=True)
-    joblib.dump(model, "models/trained_model.pkl")
-    print("✅ Model saved to models/trained_model.pkl")
+    # Save model (+ versioned artifact and manifest)
+    manifest = save_model_artifact(
+        model, feature_cols, base_year,
+        data_hash=data_hash,
+        metrics={"rmse": float(rmse), "mae": float(mae)},
+        dummy_cols=dummy_cols,
+    )
+    save_feature_cache(keys, X.to_numpy(), feature_cols, dummy_cols, base_year, holdout)
+    print("✅ Model saved to models/trained_model.pkl (version", manifest["version"] + ")")
 
     # Save base year for frontend/backend prediction normalization
-    with open("models/base_year.txt", "w") as f:
+    with open(BASE_YEAR_PATH, "w") as f:
         f.write(str(base_year))
     print("📦 Saved base year:", base_year)
 
+    # Precomputed planning numbers for the API, tagged with the model version
+    with stage_timer("train_model", "forecast_cube"):
+        materialize_forecasts(model, base_year, df[["county", "crop"]], FORECAST_DIR, manifest["version"])
+
+    return model
+
 if __name__ == "__main__":
-    train_model()
+    train_model(incremental="--incremental" in sys.argv)
@@ -0,0 +1,292 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+TopoJSON build of the county GeoJSON: coordinates are quantized to an
+integer grid, borders shared by two counties are stored once as arcs, and
+arc points are delta-encoded. Simplified copies are built per map zoom
+level by running Douglas-Peucker on the arcs (so neighbouring counties stay
+gap-free), with a tolerance of about one screen pixel at that zoom.
+
+    python src/topology.py     # prebuild data/cache/topology-*.json
+
+Geometries keep the GeoJSON feature order; per-crop value arrays served by
+the API are aligned with it.
+"""
+
+import json
+import os
+import sys
+from collections import defaultdict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.data_cleaning import SNAPSHOT_DIR, file_hash
+from src.geo import COUNTY_ALIASES, GEOJSON_PATH
+
+# Bump when the output format changes so cached builds are ignored
+TOPOLOGY_VERSION = "1"
+QUANTIZATION = 100_000
+# Simplified levels; "full" (no simplification) is always built
+ZOOM_LEVELS = [5, 6, 7, 8]
+
+
+def quantize_rings(geo_data, quantization=QUANTIZATION):
+    """Returns (features, transform); each feature is (properties, polygons of integer rings)."""
+    coords = np.concatenate([
+        np.asarray(ring, dtype=np.float64)[:, :2]
+        for feature in geo_data["features"]
+        for rings in polygons_of(feature["geometry"])
+        for ring in rings
+    ])
+    x0, y0 = coords.min(axis=0)
+    x1, y1 = coords.max(axis=0)
+    kx = (x1 - x0) / (quantization - 1) or 1.0
+    ky = (y1 - y0) / (quantization - 1) or 1.0
+
+    features = []
+    for feature in geo_data["features"]:
+        polygons = []
+        for rings in polygons_of(feature["geometry"]):
+            q_rings = []
+            for ring in rings:
+                ring = np.asarray(ring, dtype=np.float64)[:, :2]
+                q = np.column_stack([np.round((ring[:, 0] - x0) / kx), np.round((ring[:, 1] - y0) / ky)])
+                q = q.astype(np.int64)
+                # Drop points that collapsed onto their predecessor, and the closing point
+                keep = np.ones(len(q), dtype=bool)
+                keep[1:] = np.any(q[1:] != q[:-1], axis=1)
+                q = q[keep]
+                if len(q) > 1 and (q[0] == q[-1]).all():
+                    q = q[:-1]
+                if len(q) >= 3:
+                    q_rings.append([tuple(p) for p in q.tolist()])
+            if q_rings:
+                polygons.append(q_rings)
+        features.append((feature.get("properties", {}), polygons))
+
+    transform = {"scale": [kx, ky], "translate": [float(x0), float(y0)]}
+    return features, transform
+
+
+def polygons_of(geometry):
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    return geometry["coordinates"]
+
+
+def find_junctions(rings):
+    # A point is a junction when it is reached with different neighbours in different places
+    neighbours = defaultdict(set)
+    for ring in rings:
+        n = len(ring)
+        for i, p in enumerate(ring):
+            neighbours[p].add(frozenset((ring[i - 1], ring[(i + 1) % n])))
+    return {p for p, seen in neighbours.items() if len(seen) > 1}
+
+
+def cut_arcs(features):
+    """Split rings at junctions and dedupe arcs; returns (arcs, geometries as arc-index rings)."""
+    all_rings = [ring for _, polygons in features for rings in polygons for ring in rings]
+    junctions = find_junctions(all_rings)
+
+    arcs, arc_index = [], {}
+
+    def add_arc(points):
+        key = tuple(points)
+        if key in arc_index:
+            return arc_index[key]
+        reverse = key[::-1]
+        if reverse in arc_index:
+            return ~arc_index[reverse]
+        arc_index[key] = len(arcs)
+        arcs.append(points)
+        return len(arcs) - 1
+
+    geometries = []
+    for _, polygons in features:
+        arc_polygons = []
+        for rings in polygons:
+            arc_rings = []
+            for ring in rings:
+                cuts = [i for i, p in enumerate(ring) if p in junctions]
+                if not cuts:
+                    arc_rings.append([add_arc(ring + [ring[0]])])
+                    continue
+                start = cuts[0]
+                ring = ring[start:] + ring[:start]
+                cuts = [i - start for i in cuts] + [len(ring)]
+                ring = ring + [ring[0]]
+                arc_rings.append([add_arc(ring[a:b + 1]) for a, b in zip(cuts[:-1], cuts[1:])])
+            arc_polygons.append(arc_rings)
+        geometries.append(arc_polygons)
+    return arcs, geometries
+
+
+def douglas_peucker(points, tolerance):
+    """Keep-mask for an (N, 2) polyline; endpoints are always kept."""
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    if n < 3 or tolerance <= 0:
+        keep[:] = True
+        return keep
+
+    pts = points.astype(np.float64)
+    stack = [(0, n - 1)]
+    if (pts[0] == pts[-1]).all():
+        # Closed ring: split at the point farthest from the start first
+        far = int(np.argmax(((pts - pts[0]) ** 2).sum(axis=1)))
+        keep[far] = True
+        stack = [(0, far), (far, n - 1)]
+
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        seg = pts[b] - pts[a]
+        rel = pts[a + 1:b] - pts[a]
+        length = np.hypot(*seg)
+        if length == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / length
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            mid = a + 1 + i
+            keep[mid] = True
+            stack += [(a, mid), (mid, b)]
+    return keep
+
+
+def zoom_tolerance(zoom, transform):
+    # About one 256-px tile pixel at this zoom, in quantized units
+    degrees_per_pixel = 360.0 / (256 * 2 ** zoom)
+    return degrees_per_pixel / min(transform["scale"])
+
+
+def encode_topology(features, transform, arcs, geometries, tolerance=0):
+    encoded_arcs = []
+    for arc in arcs:
+        points = np.asarray(arc, dtype=np.int64)
+        points = points[douglas_peucker(points, tolerance)]
+        deltas = np.vstack([points[:1], np.diff(points, axis=0)])
+        encoded_arcs.append(deltas.tolist())
+
+    topo_geometries = []
+    for (properties, _), arc_polygons in zip(features, geometries):
+        name = properties.get("shapeName", "").strip()
+        geometry = {"properties": {"name": name, "county": COUNTY_ALIASES.get(name, name)}}
+        if len(arc_polygons) == 1:
+            geometry.update(type="Polygon", arcs=arc_polygons[0])
+        else:
+            geometry.update(type="MultiPolygon", arcs=arc_polygons)
+        topo_geometries.append(geometry)
+
+    return {
+        "type": "Topology",
+        "transform": transform,
+        "objects": {"counties": {"type": "GeometryCollection", "geometries": topo_geometries}},
+        "arcs": encoded_arcs,
+    }
+
+
+def build_topologies(geojson_path=GEOJSON_PATH, zoom_levels=ZOOM_LEVELS, quantization=QUANTIZATION):
+    """{"full": topology, zoom: simplified topology, ...}"""
+    with open(geojson_path, "r", encoding="utf-8") as f:
+        geo_data = json.load(f)
+    features, transform = quantize_rings(geo_data, quantization)
+    arcs, geometries = cut_arcs(features)
+
+    levels = {"full": encode_topology(features, transform, arcs, geometries)}
+    for zoom in zoom_levels:
+        levels[zoom] = encode_topology(features, transform, arcs, geometries, zoom_tolerance(zoom, transform))
+    return levels
+
+
+def topology_cache_path(geojson_path, zoom, cache_dir=SNAPSHOT_DIR):
+    key = f"{file_hash(geojson_path)[:16]}-v{TOPOLOGY_VERSION}"
+    return os.path.join(cache_dir, f"topology-{key}-{zoom}.json")
+
+
+def load_topologies(geojson_path=GEOJSON_PATH, zoom_levels=ZOOM_LEVELS, cache_dir=SNAPSHOT_DIR):
+    """build_topologies() backed by JSON files in cache_dir, keyed on the GeoJSON's content hash."""
+    names = ["full"] + list(zoom_levels)
+    paths = {zoom: topology_cache_path(geojson_path, zoom, cache_dir) for zoom in names}
+    if all(os.path.exists(p) for p in paths.values()):
+        levels = {}
+        for zoom, path in paths.items():
+            with open(path, "r", encoding="utf-8") as f:
+                levels[zoom] = json.load(f)
+        return levels
+
+    levels = build_topologies(geojson_path, zoom_levels)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for zoom, path in paths.items():
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(levels[zoom], f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+    except OSError as e:
+        print("⚠️ Could not cache county topology:", e)
+    return levels
+
+
+def pick_level(levels, zoom=None):
+    """Coarsest prebuilt level detailed enough for `zoom`; full detail past the last one."""
+    if zoom is None:
+        return "full"
+    for level in sorted(k for k in levels if k != "full"):
+        if level >= zoom:
+            return level
+    return "full"
+
+
+def decode_arc(arc, transform):
+    points = np.cumsum(np.asarray(arc, dtype=np.float64), axis=0)
+    return points * transform["scale"] + transform["translate"]
+
+
+def to_geojson(topology, properties=None):
+    """
+    Decode a topology back into a GeoJSON FeatureCollection (for folium).
+    `properties` is an optional list of extra property dicts, one per
+    geometry, merged into each feature; the topology itself is not modified.
+    """
+    transform = topology["transform"]
+    arcs = [decode_arc(arc, transform) for arc in topology["arcs"]]
+
+    def ring_coords(arc_ids):
+        coords = []
+        for i in arc_ids:
+            points = arcs[i] if i >= 0 else arcs[~i][::-1]
+            # Consecutive arcs share their joining point
+            coords.extend(points[1:].tolist() if coords else points.tolist())
+        return coords
+
+    features = []
+    for i, geometry in enumerate(topology["objects"]["counties"]["geometries"]):
+        if geometry["type"] == "Polygon":
+            coordinates = [ring_coords(ring) for ring in geometry["arcs"]]
+        else:
+            coordinates = [[ring_coords(ring) for ring in polygon] for polygon in geometry["arcs"]]
+        props = {"shapeName": geometry["properties"]["name"], **geometry["properties"]}
+        if properties is not None:
+            props.update(properties[i])
+        features.append({
+            "type": "Feature",
+            "properties": props,
+            "geometry": {"type": geometry["type"], "coordinates": coordinates},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+if __name__ == "__main__":
+    built = load_topologies()
+    raw_size = os.path.getsize(GEOJSON_PATH)
+    for level, topo in built.items():
+        size = len(json.dumps(topo, separators=(",", ":")))
+        print(f"🗺️ {level}: {size / 1024:.0f} KB ({raw_size / size:.1f}x smaller than the GeoJSON)")
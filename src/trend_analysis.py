@@ -0,0 +1,124 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import numpy as np
+import pandas as pd
+
+PAIR = ["county", "crop"]
+
+
+def trend_note(slope):
+    if slope > 0.2:
+        return "📈 Yield is increasing. Good trend."
+    elif slope < -0.2:
+        return "📉 Yield is decreasing. Caution advised."
+    return "⚖️ Yield is relatively stable."
+
+
+def yearly_means(df):
+    """Mean yield per (county, crop, year): the series every trend is fitted to."""
+    return (
+        df.groupby(PAIR + ["year"], observed=True)["yield_ton_per_ha"]
+        .mean()
+        .reset_index()
+    )
+
+
+def trend_statistics(df, yearly=None):
+    """
+    OLS fit of yearly mean yield on year for every (county, crop) pair, from
+    grouped sums instead of one polyfit per pair. Returns county, crop, n
+    (years), first_year, last_year, mean_yield, slope, intercept (at year 0,
+    like np.polyfit) and r2. Deviations are taken from each pair's means
+    before summing, which keeps the sums well conditioned. Pairs with a
+    single year get a NaN slope/intercept/r2; a flat series that fits
+    exactly gets r2 = 1.
+    """
+    if yearly is None:
+        yearly = yearly_means(df)
+    x = yearly["year"].to_numpy(dtype=np.float64)
+    y = yearly["yield_ton_per_ha"].to_numpy(dtype=np.float64)
+
+    groups = yearly.groupby(PAIR, observed=True, sort=False)
+    mean_x = groups["year"].transform("mean").to_numpy(dtype=np.float64)
+    mean_y = groups["yield_ton_per_ha"].transform("mean").to_numpy(dtype=np.float64)
+    dx, dy = x - mean_x, y - mean_y
+
+    sums = pd.DataFrame({
+        "county": yearly["county"], "crop": yearly["crop"],
+        "year": yearly["year"], "x": x, "y": y,
+        "sxx": dx * dx, "sxy": dx * dy, "syy": dy * dy,
+    }).groupby(PAIR, observed=True, sort=False).agg(
+        n=("x", "size"),
+        first_year=("year", "min"),
+        last_year=("year", "max"),
+        mean_x=("x", "mean"),
+        mean_yield=("y", "mean"),
+        sxx=("sxx", "sum"),
+        sxy=("sxy", "sum"),
+        syy=("syy", "sum"),
+    )
+
+    fit = (sums["n"] >= 2) & (sums["sxx"] > 0)
+    slope = np.where(fit, sums["sxy"] / sums["sxx"].where(fit, 1.0), np.nan)
+    r2 = np.where(
+        sums["syy"] > 0,
+        sums["sxy"] ** 2 / (sums["sxx"].where(fit, 1.0) * sums["syy"].where(sums["syy"] > 0, 1.0)),
+        1.0,
+    )
+
+    stats = sums[["n", "first_year", "last_year", "mean_yield"]].reset_index()
+    stats["slope"] = slope
+    stats["intercept"] = sums["mean_yield"].to_numpy() - slope * sums["mean_x"].to_numpy()
+    stats["r2"] = np.where(fit, r2, np.nan)
+    return stats
+
+
+def build_trend_index(df):
+    """
+    Precompute the yearly mean yield series, slope and trend note for every
+    (county, crop) pair in one groupby, so lookups don't touch the full frame.
+    """
+    yearly = yearly_means(df)
+    stats = trend_statistics(df, yearly)
+    # Single-year series have no trend
+    slopes = dict(zip(zip(stats["county"], stats["crop"]), np.nan_to_num(stats["slope"].to_numpy())))
+
+    index = {}
+    for (county, crop), trend in yearly.groupby(PAIR, sort=False, observed=True):
+        trend = trend[["year", "yield_ton_per_ha"]].reset_index(drop=True)
+        slope = float(slopes[(county, crop)])
+        index[(county, crop)] = {
+            "trend": trend.to_dict(orient="records"),
+            "slope": slope,
+            "trend_note": trend_note(slope),
+        }
+
+    return index
+
+
+def rank_trends(stats, sort_by="slope", ascending=True, counties=None, crops=None,
+                min_n=2, min_r2=None, min_slope=None, max_slope=None, limit=None):
+    """
+    Filter and order a trend_statistics() table. The default (slope,
+    ascending) lists the fastest declining yields first; pairs without a
+    fitted slope are always dropped.
+    """
+    mask = stats["slope"].notna() & (stats["n"] >= min_n)
+    if counties is not None:
+        mask &= stats["county"].isin(counties)
+    if crops is not None:
+        mask &= stats["crop"].isin(crops)
+    if min_r2 is not None:
+        mask &= stats["r2"] >= min_r2
+    if min_slope is not None:
+        mask &= stats["slope"] >= min_slope
+    if max_slope is not None:
+        mask &= stats["slope"] <= max_slope
+
+    ranked = stats[mask].sort_values(sort_by, ascending=ascending, kind="stable")
+    if limit is not None:
+        ranked = ranked.head(limit)
+    ranked = ranked.reset_index(drop=True)
+    ranked.insert(0, "rank", np.arange(1, len(ranked) + 1))
+    return ranked
@@ -0,0 +1,33 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import os
+import tempfile
+
+
+def current_umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Read once: os.umask can only be queried by setting it, which races with threads
+UMASK = current_umask()
+
+
+def mkstemp_shared(dir=None, suffix=".tmp"):
+    """
+    tempfile.mkstemp() for files that are renamed into place: mkstemp creates
+    them 0600, this gives the mode a plain open() would (0666 & ~umask) so
+    processes running as other users can still read the published file.
+    """
+    fd, path = tempfile.mkstemp(dir=dir, suffix=suffix)
+    os.fchmod(fd, 0o666 & ~UMASK)
+    return fd, path
+
+
+def mkdtemp_shared(dir=None, suffix=".tmp"):
+    """tempfile.mkdtemp() with the mode os.makedirs would give (0777 & ~umask) instead of 0700."""
+    path = tempfile.mkdtemp(dir=dir, suffix=suffix)
+    os.chmod(path, 0o777 & ~UMASK)
+    return path
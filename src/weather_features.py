@@ -0,0 +1,114 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import numpy as np
+import pandas as pd
+
+# Monthly thresholds for "extreme" months (POWER PRECTOTCORR is mm/day)
+DRY_MONTH_MM = 1.0
+WET_MONTH_MM = 8.0
+HOT_MONTH_C = 28.0
+
+SEASON_FEATURES = [
+    "season_precip_total",
+    "season_temp_mean",
+    "season_dry_months",
+    "season_wet_months",
+    "season_hot_months",
+    "season_months",
+]
+
+
+def season_windows(yield_df, first_year):
+    """
+    Inclusive [start, end] month offsets (from Jan of first_year) of each row's
+    growing season. HVStat "Annual" rows plant the month after they harvest;
+    for those (any planting after harvest) the window is the 12 months up to harvest.
+    """
+    harvest_col = "harvest_year" if "harvest_year" in yield_df.columns else "year"
+    start = (yield_df["planting_year"].to_numpy() - first_year) * 12 + yield_df["planting_month"].to_numpy() - 1
+    end = (yield_df[harvest_col].to_numpy() - first_year) * 12 + yield_df["harvest_month"].to_numpy() - 1
+    start = np.where(start > end, end - 11, start)
+    return start.astype(np.int64), end.astype(np.int64)
+
+
+def build_season_features(yield_df, weather, dry_mm=DRY_MONTH_MM, wet_mm=WET_MONTH_MM,
+                          hot_c=HOT_MONTH_C):
+    """
+    Aggregate monthly county weather over each yield row's planting -> harvest
+    window. `weather` is either a src.weather_store.WeatherStore (read as
+    memory-mapped county x month grids, no parsing or joins) or a long frame
+    (county, year, month, precip_mm, temp_C).
+
+    Weather is laid out as a dense county x month grid and turned into
+    cumulative sums, so every row is two gathers and a subtraction regardless
+    of window length. Rows whose window isn't fully covered by weather get NaN.
+    Returns a frame of SEASON_FEATURES aligned to yield_df's index.
+    """
+    if isinstance(weather, pd.DataFrame):
+        counties, first_year, precip, temp = frame_grids(weather)
+    else:
+        counties, first_year = weather.counties, weather.first_year
+        precip, temp = weather.grid("precip_mm"), weather.grid("temp_C")
+    return season_features_from_grids(yield_df, counties, first_year, precip, temp, dry_mm, wet_mm, hot_c)
+
+
+def frame_grids(weather_df):
+    """(counties, first_year, precip, temp) county x month grids from a long frame."""
+    counties = sorted(weather_df["county"].unique())
+    county_idx = {c: i for i, c in enumerate(counties)}
+    first_year = int(weather_df["year"].min())
+    n_months = (int(weather_df["year"].max()) - first_year + 1) * 12
+
+    # Dense county x month grids (NaN where no observation)
+    precip = np.full((len(counties), n_months), np.nan)
+    temp = np.full((len(counties), n_months), np.nan)
+    ci = weather_df["county"].map(county_idx).to_numpy()
+    mi = (weather_df["year"].to_numpy() - first_year) * 12 + weather_df["month"].to_numpy() - 1
+    precip[ci, mi] = weather_df["precip_mm"].to_numpy(dtype=np.float64)
+    temp[ci, mi] = weather_df["temp_C"].to_numpy(dtype=np.float64)
+    return counties, first_year, precip, temp
+
+
+def season_features_from_grids(yield_df, counties, first_year, precip, temp,
+                               dry_mm=DRY_MONTH_MM, wet_mm=WET_MONTH_MM, hot_c=HOT_MONTH_C):
+    county_idx = {c: i for i, c in enumerate(counties)}
+    n_months = precip.shape[1]
+
+    valid = ~np.isnan(precip) & ~np.isnan(temp)
+    layers = np.stack([
+        valid,
+        np.where(valid, precip, 0.0),
+        np.where(valid, temp, 0.0),
+        valid & (precip < dry_mm),
+        valid & (precip > wet_mm),
+        valid & (temp > hot_c),
+    ]).astype(np.float64)
+
+    # Prefix sums with a leading zero column: sum over [a, b] = cum[b + 1] - cum[a]
+    cum = np.zeros(layers.shape[:2] + (n_months + 1,))
+    np.cumsum(layers, axis=2, out=cum[:, :, 1:])
+
+    rc = yield_df["county"].map(county_idx).to_numpy(dtype=np.float64)
+    has_county = ~np.isnan(rc)
+    rc = np.where(has_county, rc, 0).astype(np.int64)
+    start, end = season_windows(yield_df, first_year)
+    lo = np.clip(start, 0, n_months)
+    hi = np.clip(end + 1, 0, n_months)
+
+    sums = cum[:, rc, hi] - cum[:, rc, lo]
+    months = end - start + 1
+    covered = has_county & (start >= 0) & (end < n_months) & (sums[0] == months)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        features = pd.DataFrame({
+            "season_precip_total": sums[1],
+            "season_temp_mean": sums[2] / sums[0],
+            "season_dry_months": sums[3],
+            "season_wet_months": sums[4],
+            "season_hot_months": sums[5],
+            "season_months": months.astype(np.float64),
+        }, index=yield_df.index)
+
+    features.loc[~covered] = np.nan
+    return features
@@ -1,14 +1,50 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
 import pandas as pd
 
-def fetch_power(lat, lon, start="20000101", end="20241231"):
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.geo import GEOJSON_PATH, county_centroids
+from src.utils import mkstemp_shared
+
+# Override to point the fetcher at a local stand-in server
+POWER_BASE_URL = os.environ.get("MAVUNO_POWER_URL", "https://power.larc.nasa.gov")
+CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache", "weather"))
+
+# POWER marks missing values with this fill value
+FILL_VALUE = -999
+
+
+def get_json(url, timeout=30, retries=4, backoff=1.0):
+    """GET with a timeout, retrying connection errors, 429 and 5xx with exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            r = requests.get(url, timeout=timeout)
+            if r.status_code != 429 and r.status_code < 500:
+                r.raise_for_status()
+                return r.json()
+            error = requests.HTTPError(f"{r.status_code} from {url}", response=r)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+
+        if attempt < retries:
+            time.sleep(backoff * 2 ** attempt)
+    raise error
+
+
+def fetch_power(lat, lon, start="20000101", end="20241231", base_url=None):
     url = (
-        f"https://power.larc.nasa.gov/api/temporal/monthly/point"
+        f"{base_url or POWER_BASE_URL}/api/temporal/monthly/point"
         f"?parameters=T2M,PRECTOT&community=AG&latitude={lat}&longitude={lon}"
         f"&start={start}&end={end}&format=JSON"
     )
-    r = requests.get(url)
-    data = r.json()["properties"]["parameter"]
+    data = get_json(url)["properties"]["parameter"]
 
     df = pd.DataFrame(data)
     df = df.T.reset_index()
@@ -16,3 +52,100 @@ def fetch_power(lat, lon, start="20000101", end="20241231"):
     df["year"] = df["year_month"].str[:4].astype(int)
     df = df.groupby("year")[["T2M", "PRECTOT"]].mean().reset_index()
     return df
+
+
+def monthly_url(lat, lon, year, base_url=None):
+    return (
+        f"{base_url or POWER_BASE_URL}/api/temporal/monthly/point"
+        f"?parameters=T2M,PRECTOTCORR&community=AG"
+        f"&latitude={lat:.4f}&longitude={lon:.4f}"
+        f"&start={year}&end={year}&format=JSON"
+    )
+
+
+def parse_monthly(parameters, year):
+    records = []
+    for month in range(1, 13):
+        ym_key = f"{year}{month:02d}"
+        precip = parameters.get("PRECTOTCORR", {}).get(ym_key)
+        temp = parameters.get("T2M", {}).get(ym_key)
+        records.append({
+            "year": year,
+            "month": month,
+            "precip_mm": None if precip in (None, FILL_VALUE) else precip,
+            "temp_C": None if temp in (None, FILL_VALUE) else temp,
+        })
+    return records
+
+
+def fetch_point_year(lat, lon, year, base_url=None, cache_dir=CACHE_DIR, **http):
+    """
+    Monthly records for one point and year. Responses are stored under the
+    SHA-256 of their request (minus the host), and only once all 12 months are
+    present, so a rerun refetches just the years that were missing or partial.
+    """
+    url = monthly_url(lat, lon, year, base_url)
+    key = hashlib.sha256(monthly_url(lat, lon, year, base_url="").encode()).hexdigest()
+    path = os.path.join(cache_dir, key[:2], f"{key}.json")
+
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return parse_monthly(json.load(f), year)
+
+    parameters = get_json(url, **http)["properties"]["parameter"]
+    records = parse_monthly(parameters, year)
+
+    if all(r["precip_mm"] is not None and r["temp_C"] is not None for r in records):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = mkstemp_shared(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(parameters, f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return records
+
+
+def fetch_points_weather(points, start=2000, end=2023, max_workers=8, base_url=None,
+                         cache_dir=CACHE_DIR, **http):
+    """
+    Fetch monthly weather for {name: (lat, lon)} points over [start, end] on a
+    bounded thread pool, one request per (point, year). Failed requests are
+    reported and left out, so rerunning fills in just the gaps.
+    """
+    records = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(fetch_point_year, lat, lon, year, base_url, cache_dir, **http): (name, year)
+            for name, (lat, lon) in points.items()
+            for year in range(start, end + 1)
+        }
+        for future in as_completed(futures):
+            name, year = futures[future]
+            try:
+                for record in future.result():
+                    records.append({"county": name, **record})
+            except Exception as e:
+                failed.append((name, year))
+                print(f"⚠️ Weather fetch failed for {name} {year}: {e}")
+
+    if failed:
+        print(f"⚠️ {len(failed)} of {len(futures)} requests failed; rerun to retry them")
+
+    df = pd.DataFrame(records, columns=["county", "year", "month", "precip_mm", "temp_C"])
+    return df.sort_values(["county", "year", "month"]).reset_index(drop=True)
+
+
+def fetch_county_weather(start=2000, end=2023, geojson_path=GEOJSON_PATH, **kwargs):
+    """Monthly weather at every county's polygon centroid (see fetch_points_weather)."""
+    return fetch_points_weather(county_centroids(geojson_path), start, end, **kwargs)
+
+
+if __name__ == "__main__":
+    df_weather = fetch_county_weather()
+    df_weather.to_csv("data/county_weather_2000_2023.csv", index=False)
+    print("💾 Saved to: data/county_weather_2000_2023.csv")
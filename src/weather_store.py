@@ -0,0 +1,203 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+"""
+Monthly weather for every county in one memory-mapped array of shape
+county × month × variable (data/weather_store/values.npy), so reads are
+array slices instead of CSV parsing and DataFrame joins.
+
+    python src/weather_store.py data/county_weather_2000_2023.csv   # build from a fetcher CSV
+
+Rows are indexed by county name and columns by (year, month) offset from
+January of first_year. The month axis is over-allocated so append_month()
+only writes the new slot and bumps n_months in meta.json; readers never see
+a month before its values are on disk. Missing observations are NaN.
+"""
+
+import json
+import os
+import shutil
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+from src.utils import mkdtemp_shared
+
+STORE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "weather_store"))
+VARIABLES = ["precip_mm", "temp_C"]
+# Spare months allocated past the last one when the store is created or grown
+SPARE_MONTHS = 60
+
+
+class WeatherStore:
+    def __init__(self, store_dir=STORE_DIR, mode="r"):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            meta = json.load(f)
+        self.counties = meta["counties"]
+        self.variables = meta["variables"]
+        self.first_year = meta["first_year"]
+        self.n_months = meta["n_months"]
+        self.county_index = {c: i for i, c in enumerate(self.counties)}
+        self.variable_index = {v: i for i, v in enumerate(self.variables)}
+        self._values = np.load(os.path.join(store_dir, "values.npy"), mmap_mode=mode)
+
+    @property
+    def values(self):
+        """county × month × variable view of the months written so far."""
+        return self._values[:, :self.n_months]
+
+    def month_index(self, year, month):
+        return (int(year) - self.first_year) * 12 + int(month) - 1
+
+    def month_of(self, index):
+        return self.first_year + index // 12, index % 12 + 1
+
+    def row(self, county):
+        try:
+            return self.county_index[county]
+        except KeyError:
+            raise KeyError(f"No weather for county: {county}") from None
+
+    def column(self, year, month):
+        i = self.month_index(year, month)
+        if not 0 <= i < self.n_months:
+            raise KeyError(f"No weather for {int(year)}-{int(month):02d}")
+        return i
+
+    def point(self, county, year, month, variable=None):
+        """One month for one county: all variables, or a single float."""
+        values = self.values[self.row(county), self.column(year, month)]
+        if variable is None:
+            return dict(zip(self.variables, values.tolist()))
+        return float(values[self.variable_index[variable]])
+
+    def window(self, county, start, end):
+        """(months, variable) view for start=(year, month) .. end=(year, month), inclusive."""
+        a, b = self.column(*start), self.column(*end)
+        return self.values[self.row(county), a:b + 1]
+
+    def season(self, county, planting_year, planting_month, harvest_year, harvest_month):
+        """
+        Window for one growing season. As in weather_features.season_windows,
+        a planting after the harvest (HVStat "Annual") means the 12 months up
+        to harvest.
+        """
+        end = self.month_index(harvest_year, harvest_month)
+        start = self.month_index(planting_year, planting_month)
+        if start > end:
+            start = end - 11
+        return self.window(county, self.month_of(start), self.month_of(end))
+
+    def grid(self, variable):
+        """county × month view of one variable (for vectorized feature building)."""
+        return self.values[:, :, self.variable_index[variable]]
+
+    def append_month(self, year, month, values):
+        """
+        Write the month after the last one. `values` maps county -> {variable:
+        value} (missing counties/variables become NaN) or is a
+        (county, variable) array in store order.
+        """
+        if self.month_index(year, month) != self.n_months:
+            raise ValueError(f"Expected {'%d-%02d' % self.month_of(self.n_months)}, got {year}-{int(month):02d}")
+
+        if isinstance(values, dict):
+            block = np.full((len(self.counties), len(self.variables)), np.nan)
+            for county, row in values.items():
+                for variable, value in row.items():
+                    block[self.row(county), self.variable_index[variable]] = value
+        else:
+            block = np.asarray(values, dtype=np.float64)
+
+        if self.n_months == self._values.shape[1]:
+            self._grow()
+        writable = np.load(os.path.join(self.store_dir, "values.npy"), mmap_mode="r+")
+        writable[:, self.n_months] = block
+        writable.flush()
+        del writable
+
+        self.n_months += 1
+        self._write_meta()
+
+    def _grow(self):
+        # Out of spare months: copy into a larger array once, then keep appending in place
+        old = self._values
+        path = os.path.join(self.store_dir, "values.npy")
+        tmp_path = path + ".tmp"
+        grown = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float64,
+            shape=(old.shape[0], old.shape[1] + SPARE_MONTHS, old.shape[2]),
+        )
+        grown[:] = np.nan
+        grown[:, :old.shape[1]] = old
+        grown.flush()
+        del grown
+        os.replace(tmp_path, path)
+        self._values = np.load(path, mmap_mode="r")
+
+    def _write_meta(self):
+        write_meta(self.store_dir, self.counties, self.variables, self.first_year, self.n_months)
+
+
+def write_meta(store_dir, counties, variables, first_year, n_months):
+    path = os.path.join(store_dir, "meta.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "counties": list(counties), "variables": list(variables),
+            "first_year": int(first_year), "n_months": int(n_months),
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def build_store(weather_df, store_dir=STORE_DIR, variables=VARIABLES, counties=None):
+    """
+    Create a store from a long frame (county, year, month, *variables).
+    Pass `counties` to reserve rows for counties without data yet.
+    """
+    counties = sorted(set(counties or []) | set(weather_df["county"].unique()))
+    county_idx = {c: i for i, c in enumerate(counties)}
+    first_year = int(weather_df["year"].min())
+    n_months = (int(weather_df["year"].max()) - first_year + 1) * 12
+
+    parent = os.path.dirname(os.path.abspath(store_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = mkdtemp_shared(dir=parent)
+    try:
+        values = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, "values.npy"), mode="w+", dtype=np.float64,
+            shape=(len(counties), n_months + SPARE_MONTHS, len(variables)),
+        )
+        values[:] = np.nan
+        ci = weather_df["county"].map(county_idx).to_numpy()
+        mi = (weather_df["year"].to_numpy() - first_year) * 12 + weather_df["month"].to_numpy() - 1
+        for v, variable in enumerate(variables):
+            values[ci, mi, v] = weather_df[variable].to_numpy(dtype=np.float64)
+        values.flush()
+        del values
+        write_meta(tmp_dir, counties, variables, first_year, n_months)
+
+        if os.path.exists(store_dir):
+            shutil.rmtree(store_dir)
+        os.replace(tmp_dir, store_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return WeatherStore(store_dir)
+
+
+def store_exists(store_dir=STORE_DIR):
+    return os.path.exists(os.path.join(store_dir, "meta.json"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python src/weather_store.py <county_weather.csv>")
+        sys.exit(1)
+    store = build_store(pd.read_csv(sys.argv[1]))
+    print(f"✅ Weather store: {len(store.counties)} counties × {store.n_months} months × "
+          f"{len(store.variables)} variables -> {store.store_dir}")
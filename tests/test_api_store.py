@@ -0,0 +1,28 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import pytest
+
+import api.app as app_module
+from src.ingest import init_store
+
+
+@pytest.fixture
+def store_client(tmp_path, monkeypatch):
+    store_dir = str(tmp_path / "store")
+    init_store(store_dir=store_dir)
+    monkeypatch.setattr(app_module, "STORE_DIR", store_dir)
+    app_module.load_data()
+    yield app_module.app.test_client()
+    monkeypatch.undo()
+    app_module.load_data()
+
+
+def test_recommend_by_county_from_store(store_client):
+    county = app_module.county_crops["county"].iloc[0]
+    for body in ({"county": county}, {"counties": [county, "Nope"]}):
+        response = store_client.post("/recommend", json={"year": 2025, "area_ha": 10, **body})
+        assert response.status_code == 200, response.json
+        recommendations = response.json["recommendations"]
+        assert recommendations
+        assert {r["county"] for r in recommendations} == {county}
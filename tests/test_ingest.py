@@ -0,0 +1,36 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import numpy as np
+import pandas as pd
+
+from src.ingest import ingest_delta, init_store, load_store, read_manifest
+
+DATA_PATH = "data/kenya_only.csv"
+
+
+def test_reingest_with_blank_year_adds_nothing(tmp_path):
+    raw = pd.read_csv(DATA_PATH)
+    raw = raw[raw["harvest_year"] >= 2000].head(50)
+    source = tmp_path / "source.csv"
+    raw.to_csv(source, index=False)
+    store_dir = str(tmp_path / "store")
+    init_store(str(source), store_dir)
+    rows = read_manifest(store_dir)["rows"]
+
+    # The same rows again, plus one with a blank year: the year column parses as float64
+    blank = raw.head(1).assign(harvest_year=np.nan)
+    delta = tmp_path / "delta.csv"
+    pd.concat([raw, blank]).to_csv(delta, index=False)
+
+    assert ingest_delta(str(delta), store_dir) == 0
+    assert read_manifest(store_dir)["rows"] == rows
+
+    # A new season with a blank year alongside still lands with an integer year
+    new = raw.drop_duplicates(["fnid", "season_name", "product", "crop_production_system"])
+    new = new.assign(harvest_year=2031)
+    pd.concat([new, blank]).to_csv(delta, index=False)
+    assert ingest_delta(str(delta), store_dir) == len(new)
+    df, _ = load_store(store_dir)
+    assert len(df) == rows + len(new)
+    assert df["year"].dtype == np.int64
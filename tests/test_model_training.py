@@ -0,0 +1,22 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import pandas as pd
+
+from src.model_training import baseline_crop, encode_features, encode_new_rows
+
+
+def frame(crops):
+    return pd.DataFrame({
+        "year": 2010, "area_ha": 1.0, "crop": crops,
+        "crop_production_system": "All (PS)",
+    })
+
+
+def test_incremental_crop_sorting_first_keeps_baseline():
+    _, feature_cols, dummy_cols = encode_features(frame(["Bambara groundnut", "Maize", "Sorghum"]), 2000)
+    assert baseline_crop(feature_cols, dummy_cols) == "Bambara groundnut"
+
+    _, feature_cols, dummy_cols = encode_new_rows(frame(["Avocado", "Maize"]), 2000, feature_cols, dummy_cols)
+    assert "crop_Avocado" in feature_cols
+    assert baseline_crop(feature_cols, dummy_cols) == "Bambara groundnut"
@@ -0,0 +1,41 @@
+# © 2025 Geddy Wendot / Trivium Technology Group. All rights reserved.
+# Unauthorized use, reproduction, or modification is strictly prohibited.
+
+import os
+
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+import src.model_training as training
+from api.model_utils import load_serving_model, model_crops
+from src.model_training import encode_features, encode_new_rows, save_model_artifact
+
+
+def frame(crops):
+    return pd.DataFrame({"year": 2010, "area_ha": 1.0, "crop": crops})
+
+
+def test_incremental_crop_sorting_first_still_serves_baseline(tmp_path, monkeypatch):
+    models_dir = str(tmp_path)
+    monkeypatch.setattr(training, "MODELS_DIR", models_dir)
+    monkeypatch.setattr(training, "MODEL_PATH", os.path.join(models_dir, "trained_model.pkl"))
+    monkeypatch.setattr(training, "MANIFEST_PATH", os.path.join(models_dir, "manifest.json"))
+    monkeypatch.setattr(training, "FOREST_DIR", os.path.join(models_dir, "forest"))
+
+    _, feature_cols, dummy_cols = encode_features(frame(["Bambara groundnut", "Maize", "Sorghum"]), 2000)
+    # An incremental run adds a crop that sorts before the trained baseline
+    X, feature_cols, dummy_cols = encode_new_rows(frame(["Avocado", "Maize"]), 2000, feature_cols, dummy_cols)
+    model = RandomForestRegressor(n_estimators=2, random_state=0)
+    model.fit(pd.DataFrame(X, columns=feature_cols), [1.0, 2.0])
+    save_model_artifact(model, feature_cols, 2000, "test", {}, dummy_cols=dummy_cols)
+    with open(os.path.join(models_dir, "base_year.txt"), "w") as f:
+        f.write("2000")
+
+    serving = load_serving_model(
+        training.MODEL_PATH, training.FOREST_DIR, training.MANIFEST_PATH,
+        os.path.join(models_dir, "base_year.txt"),
+    )
+    assert serving.baseline_crop == "Bambara groundnut"
+    crops = ["Avocado", "Bambara groundnut", "Beans", "Maize", "Sorghum"]
+    known = model_crops(serving.model.feature_names_in_, crops, serving.baseline_crop)
+    assert known == {"Avocado", "Bambara groundnut", "Maize", "Sorghum"}